@@ -1,5 +1,13 @@
+from adbc.utils import aecho
+from adbc.retry import RETRY_POLICIES
+
+
 class DatabaseBackend(object):
     FUNCTIONS = {}
+    # most bound parameters allowed in one statement
+    max_parameters = 32767
+    # error class -> RetryPolicy, for idempotent operations
+    retry_policies = RETRY_POLICIES
 
     @classmethod
     def has(cls, feature):
@@ -13,6 +21,71 @@ class DatabaseBackend(object):
     def has_function(cls, fn):
         return fn in cls.FUNCTIONS
 
+    def transaction(self, connection):
+        """Get a transaction context for a connection"""
+        return connection.transaction()
+
+    def statement(self, connection, timeout=None, default=None):
+        """Get a context for running statements on a connection
+
+        Arguments:
+            timeout: statement timeout in seconds, 0 for no timeout
+            default: timeout the connection was opened with
+
+        By default, the connection is used as-is
+        """
+        return aecho(connection)
+
+    def bulk_load(self, connection, pragmas=None):
+        """Get a bulk load context for a connection
+
+        By default, the connection is used as-is
+        """
+        return aecho(connection)
+
+    async def warm_up_pool(self, pool, size):
+        """Open pool connections until size are open"""
+        warm_up = getattr(pool, 'warm_up', None)
+        if warm_up:
+            await warm_up(size)
+
+    async def check_pool(self, pool, limiters=()):
+        """Ping idle pool connections, evicting broken and stale ones
+
+        Arguments:
+            limiters: semaphores that connections taken from the pool
+                for a ping hold a slot of, see Database.acquire
+
+        Returns:
+            dict with the number of connections checked and evicted,
+            or None if the pool cannot be checked
+        """
+        check = getattr(pool, 'check', None)
+        return await check() if check else None
+
+    async def fetch_columns(self, connection, query, params=None):
+        """Fetch result rows and their column names
+
+        Names are known even without rows, e.g. for columnar results
+        """
+        rows = await self.fetch(connection, query, params)
+        return rows, list(rows[0].keys()) if rows else []
+
+    @staticmethod
+    def get_statement_stats():
+        """Prepared statement cache stats, if the backend keeps any"""
+        return None
+
+    @staticmethod
+    def get_row_count(result):
+        """Number of rows affected, from the result of execute"""
+        return result if isinstance(result, int) else None
+
+    @staticmethod
+    def get_replica_lag_query():
+        """Query for a replica's lag behind its primary in seconds, if any"""
+        return None
+
     @staticmethod
     def get_include_zql(include, table, column, tag=None):
         clauses = []
@@ -1,7 +1,9 @@
 import re
 import json
 import ssl
+import asyncio
 
+from contextlib import AsyncExitStack
 from adbc.exceptions import NotIncluded
 from typing import Union
 from collections import defaultdict
@@ -10,20 +12,155 @@ from cached_property import cached_property
 from adbc.utils import raise_not_implemented
 
 try:
-    from asyncpg import create_pool, connect
+    from asyncpg import create_pool, connect, Connection
+    from asyncpg.exceptions import (
+        SerializationError,
+        DeadlockDetectedError,
+        ConnectionDoesNotExistError,
+        CannotConnectNowError,
+        TooManyConnectionsError
+    )
 except ImportError:
     create_pool = raise_not_implemented('install asyncpg')
     connect = raise_not_implemented('install async')
+    Connection = object
+    SerializationError = DeadlockDetectedError = None
+    ConnectionDoesNotExistError = CannotConnectNowError = None
+    TooManyConnectionsError = None
 
 from urllib.parse import urlparse, parse_qs, urlencode
 from adbc.zql.dialect import Dialect, Backend, ParameterStyle
 from adbc.zql import parse_expression, build
+from adbc.retry import RETRY_POLICIES, RetryPolicy
 
 
 EMPTY_CLAUSE = {'=': [1, 1]}
 TAGGED_NUMBER_REGEX = re.compile(r'[a-zA-Z]+ ([0-9]+)')
+# seconds to wait for a health check ping
+PING_TIMEOUT = 5
+# transient server errors: conflicts retry quickly, connections slowly
+RETRY_POLICIES = {
+    **RETRY_POLICIES,
+    **{
+        error: policy for error, policy in (
+            (SerializationError, RetryPolicy(retries=5, base=0.05)),
+            (DeadlockDetectedError, RetryPolicy(retries=5, base=0.05)),
+            (ConnectionDoesNotExistError, RetryPolicy(retries=3, base=0.5)),
+            (CannotConnectNowError, RetryPolicy(retries=5, base=1.)),
+            (TooManyConnectionsError, RetryPolicy(retries=5, base=1.))
+        ) if error is not None
+    }
+}
+
+
+def get_milliseconds(timeout):
+    return int(timeout * 1000) if timeout else 0
+
+
+def set_statement_timeout(kwargs):
+    """Open connections with a statement timeout, for connect kwargs
+
+    As a server setting, RESET restores it, e.g. when the pool
+    releases a connection
+    """
+    timeout = kwargs.pop('statement_timeout', None)
+    if timeout is not None:
+        settings = dict(kwargs.get('server_settings') or {})
+        settings['statement_timeout'] = str(get_milliseconds(timeout))
+        kwargs['server_settings'] = settings
+    return kwargs
 
 
+class PostgresStatement(object):
+    """Statement timeout override for a connection
+
+    Overrides shorter than the statement_timeout setting are client-side
+    timeouts, see get_timeout, after which asyncpg cancels the query on
+    the server: no round trip is needed. Longer overrides SET the setting
+    while the connection is in use, then restore it
+
+    Running queries are cancelled on the server by asyncpg
+    when the task running them is cancelled
+    """
+    # connection -> (client-side timeout, statement_timeout set or None)
+    overrides = {}
+
+    def __init__(self, connection, timeout=None, default=None):
+        self.connection = connection
+        self.timeout = timeout if timeout != default else None
+        self.default = default
+        self.previous = None
+
+    @classmethod
+    def get_timeout(cls, connection):
+        """Client-side timeout for statements on a connection"""
+        return cls.overrides.get(connection, (None, None))[0]
+
+    async def apply(self, setting, previous):
+        if setting == previous:
+            return
+        if setting is None:
+            await self.connection.execute('RESET statement_timeout')
+        else:
+            await self.connection.execute(f'SET statement_timeout = {setting}')
+
+    async def __aenter__(self):
+        timeout = self.timeout
+        if timeout is None:
+            return self.connection
+        self.previous = self.overrides.get(self.connection, (None, None))
+        if timeout and (not self.default or timeout < self.default):
+            override = (timeout, self.previous[1])
+        elif self.default:
+            # no timeout or longer than the setting
+            override = (None, get_milliseconds(timeout))
+        else:
+            override = (None, None)
+        await self.apply(override[1], self.previous[1])
+        self.overrides[self.connection] = override
+        return self.connection
+
+    async def __aexit__(self, type, value, traceback):
+        if self.timeout is None:
+            return
+        override = self.overrides.pop(self.connection)
+        if self.previous != (None, None):
+            self.overrides[self.connection] = self.previous
+        try:
+            await self.apply(self.previous[1], override[1])
+        except Exception:
+            # in an aborted transaction: reset by the rollback
+            if type is None:
+                raise
+
+
+class StatementCountingConnection(Connection):
+    """asyncpg connection that counts prepared statement reuse
+
+    asyncpg prepares each query once per connection and reuses it from
+    the connection's cache, see statement_cache_size. Cache hits and
+    misses are counted across connections, see get_statement_stats
+    """
+    __slots__ = ()
+    hits = 0
+    misses = 0
+
+    async def _get_statement(self, query, timeout, *, use_cache=True, **kwargs):
+        if use_cache:
+            # the cache key of asyncpg's Connection._get_statement
+            key = (
+                query,
+                kwargs.get('record_class') or self._protocol.get_record_class(),
+                kwargs.get('ignore_custom_codec', False)
+            )
+            if self._stmt_cache.get(key, promote=False) is None:
+                StatementCountingConnection.misses += 1
+            else:
+                StatementCountingConnection.hits += 1
+        return await super()._get_statement(
+            query, timeout, use_cache=use_cache, **kwargs
+        )
+
 
 class PostgresBackend(DatabaseBackend):
     """Postgres backend based on asyncpg"""
@@ -36,6 +173,16 @@ class PostgresBackend(DatabaseBackend):
         backend=Backend.POSTGRES,
         style=ParameterStyle.DOLLAR_NUMERIC
     )
+    retry_policies = RETRY_POLICIES
+    # prepared statements kept per connection by asyncpg,
+    # which re-prepares them after schema changes
+    statement_cache_size = 256
+    has_update_from = True
+    # connections can be opened with a statement timeout
+    has_statement_timeout = True
+    has_array_parameters = True
+    # unparameterized SQL may contain several statements
+    has_multiple_statements = True
 
     def build(self, query: Union[dict, list]):
         return build(query, dialect=self.dialect)
@@ -45,30 +192,136 @@ class PostgresBackend(DatabaseBackend):
         return parse_expression(expression, Backend.POSTGRES)
 
     async def copy_to_table(self, connection, table_name, **kwargs):
+        kwargs.setdefault('timeout', self.get_timeout(connection))
         result = await connection.copy_to_table(table_name, **kwargs)
         return self.get_tagged_number(result)
 
     async def copy_from_table(self, connection, table_name, **kwargs):
+        kwargs.setdefault('timeout', self.get_timeout(connection))
         result = await connection.copy_from_table(table_name, **kwargs)
         return self.get_tagged_number(result)
 
     async def copy_from_query(self, connection, query, params=None, **kwargs):
         params = params or []
+        kwargs.setdefault('timeout', self.get_timeout(connection))
         result = await connection.copy_from_query(query, *params, **kwargs)
         return self.get_tagged_number(result)
 
     async def execute(self, connection, query, params=None):
         params = params or []
-        return await connection.execute(query, *params)
+        return await connection.execute(
+            query, *params, timeout=self.get_timeout(connection)
+        )
 
-    async def cursor(self, connection, query, params=None):
+    def statement(self, connection, timeout=None, default=None):
+        return PostgresStatement(connection, timeout=timeout, default=default)
+
+    @staticmethod
+    def get_timeout(connection):
+        return PostgresStatement.get_timeout(connection)
+
+    async def warm_up_pool(self, pool, size):
+        # asyncpg opens connections as concurrent acquires need them
+        size = min(size, pool.get_max_size()) - pool.get_size()
+        if size <= 0:
+            return
+        connections = await asyncio.gather(
+            *[pool.acquire() for _ in range(size)], return_exceptions=True
+        )
+        for connection in connections:
+            if not isinstance(connection, BaseException):
+                await pool.release(connection)
+
+    async def check_pool(self, pool, limiters=()):
+        # stale connections are closed by asyncpg,
+        # see max_inactive_connection_lifetime
+        waiting = pool.get_idle_size()
+        acquired = asyncio.Event()
+
+        async def acquire(stack):
+            # one slot of each limiter per connection, as in Database.acquire
+            for limiter in limiters:
+                await stack.enter_async_context(limiter)
+            return await pool.acquire()
+
+        async def check():
+            nonlocal waiting
+            async with AsyncExitStack() as stack:
+                try:
+                    connection = await asyncio.wait_for(
+                        acquire(stack), PING_TIMEOUT
+                    )
+                except Exception:
+                    # busy or unreachable, not checked
+                    return None
+                finally:
+                    waiting -= 1
+                    if not waiting:
+                        acquired.set()
+                try:
+                    # hold all connections before releasing any:
+                    # the pool hands out the last released one first
+                    await acquired.wait()
+                    await connection.fetchval('SELECT 1', timeout=PING_TIMEOUT)
+                except Exception:
+                    # returns its slot to the pool, without the connection
+                    connection.terminate()
+                    return False
+                except BaseException:
+                    await pool.release(connection)
+                    raise
+                await pool.release(connection)
+                return True
+
+        results = await asyncio.gather(*[check() for _ in range(waiting)])
+        return {
+            'checked': len(results) - results.count(None),
+            'evicted': results.count(False)
+        }
+
+    async def cursor(self, connection, query, params=None, prefetch=None):
         params = params or []
-        async for x in connection.cursor(query, *params):
+        cursor = connection.cursor(
+            query, *params, prefetch=prefetch,
+            timeout=self.get_timeout(connection)
+        )
+        async for x in cursor:
             yield x
 
     async def fetch(self, connection, query, params=None):
         params = params or []
-        return await connection.fetch(query, *params)
+        # prepared once per connection, see statement_cache_size
+        return await connection.fetch(
+            query, *params, timeout=self.get_timeout(connection)
+        )
+
+    async def fetch_columns(self, connection, query, params=None):
+        rows = await self.fetch(connection, query, params)
+        if rows:
+            return rows, list(rows[0].keys())
+        # no rows to read names from: only prepared, not run again
+        statement = await connection.prepare(
+            query, timeout=self.get_timeout(connection)
+        )
+        return rows, [attribute.name for attribute in statement.get_attributes()]
+
+    @staticmethod
+    def get_statement_stats():
+        # process-wide, see StatementCountingConnection
+        hits = StatementCountingConnection.hits
+        misses = StatementCountingConnection.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else None
+        }
+
+    @staticmethod
+    def get_row_count(result):
+        # command tags, e.g. "UPDATE 3" or "INSERT 0 3", end with the count
+        count = result.rsplit(' ', 1)[-1] if isinstance(result, str) else None
+        return int(count) if count and count.isdigit() else None
 
     def get_tagged_number(self, value):
         match = TAGGED_NUMBER_REGEX.match(value)
@@ -551,12 +804,34 @@ class PostgresBackend(DatabaseBackend):
         }
         return query
 
+    @staticmethod
+    def get_replica_lag_query():
+        # an idle primary sends no new transactions:
+        # a replica that replayed everything it received is not lagging
+        return (
+            'SELECT CASE'
+            ' WHEN NOT pg_is_in_recovery()'
+            ' OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()'
+            ' THEN 0'
+            ' ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())'
+            '::float END'
+        )
+
     @staticmethod
     def get_version_query():
         return {'select': {'data': {'version': {'version': []}}}}
 
     @staticmethod
     async def create_pool(url, **kwargs):
+        # sqlite only
+        kwargs.pop('pragmas', None)
+        kwargs.setdefault('statement_cache_size', PostgresBackend.statement_cache_size)
+        kwargs.setdefault('connection_class', StatementCountingConnection)
+        set_statement_timeout(kwargs)
+        if 'max_idle' in kwargs:
+            # None or 0: never close idle connections
+            max_idle = kwargs.pop('max_idle') or 0
+            kwargs['max_inactive_connection_lifetime'] = max_idle
         if 'init' not in kwargs:
             # initialize connection with json loading
             kwargs['init'] = PostgresBackend.initialize_connection
@@ -589,7 +864,9 @@ class PostgresBackend(DatabaseBackend):
 
     @classmethod
     async def connect(cls, url, **kwargs):
-        return await connect(dsn=url, **kwargs)
+        kwargs.setdefault('statement_cache_size', cls.statement_cache_size)
+        kwargs.setdefault('connection_class', StatementCountingConnection)
+        return await connect(dsn=url, **set_statement_timeout(kwargs))
 
     @staticmethod
     async def initialize_connection(connection):
@@ -1,9 +1,16 @@
+import os
 import re
 import json
+import inspect
 import ssl
+import time
+import asyncio
 import hashlib
+import collections
+from contextlib import contextmanager
 
 from adbc.exceptions import NotIncluded
+from adbc.generators import G
 from adbc.utils import raise_not_implemented
 try:
     from aiosqlite import connect, Row
@@ -24,64 +31,685 @@ from adbc.utils import aecho
 
 EMPTY_CLAUSE = {'=': [1, 1]}
 TAGGED_NUMBER_REGEX = re.compile(r'[a-zA-Z]+ ([0-9]+)')
+AUTOINCREMENT_REGEX = re.compile(r'\bAUTOINCREMENT\b', re.IGNORECASE)
+# table-level named constraints, e.g:
+#   CONSTRAINT "a__b__fk" FOREIGN KEY ("b") REFERENCES "c" ("id") DEFERRABLE
+# pragmas do not expose constraint names or deferrability
+CONSTRAINT_REGEX = re.compile(
+    r'CONSTRAINT\s+["`\[]?(\w+)["`\]]?\s+'
+    r'(PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY)\s*\(([^)]*)\)'
+    r'(?:\s*REFERENCES\s+["`\[]?[\w.]+["`\]]?\s*(?:\([^)]*\))?)?'
+    r'(?:\s+ON\s+(?:DELETE|UPDATE)\s+'
+    r'(?:SET\s+NULL|SET\s+DEFAULT|CASCADE|RESTRICT|NO\s+ACTION))*'
+    r'((?:\s+(?:NOT\s+)?DEFERRABLE)?(?:\s+INITIALLY\s+(?:DEFERRED|IMMEDIATE))?)',
+    re.IGNORECASE
+)
+CONSTRAINT_TYPES = {
+    'PRIMARY KEY': 'primary',
+    'UNIQUE': 'unique',
+    'FOREIGN KEY': 'foreign'
+}
+CONSTRAINT_SUFFIXES = {
+    'primary': 'pk',
+    'unique': 'uk',
+    'foreign': 'fk'
+}
+# one row per table with columns, foreign keys and indexes as JSON arrays
+# nested arrays are wrapped in json() so they are not re-encoded as strings
+TABLES_QUERY = '''SELECT
+    M.name,
+    M.sql,
+    (
+        SELECT json_group_array(json_object(
+            'name', C.name,
+            'type', C.type,
+            'notnull', C."notnull",
+            'default', C.dflt_value,
+            'pk', C.pk
+        ))
+        FROM pragma_table_info(M.name) AS C
+    ) AS columns,
+    (
+        SELECT json_group_array(json_object(
+            'id', F.id,
+            'seq', F.seq,
+            'table', F."table",
+            'from', F."from",
+            'to', F."to"
+        ))
+        FROM pragma_foreign_key_list(M.name) AS F
+    ) AS foreign_keys,
+    (
+        SELECT json_group_array(json_object(
+            'name', I.name,
+            'unique', I."unique",
+            'origin', I.origin,
+            'columns', json((
+                SELECT json_group_array(X.name)
+                FROM (
+                    SELECT name
+                    FROM pragma_index_xinfo(I.name)
+                    WHERE key = 1
+                    ORDER BY seqno
+                ) AS X
+            ))
+        ))
+        FROM pragma_index_list(M.name) AS I
+    ) AS indexes
+FROM sqlite_master AS M
+WHERE M.type = 'table'
+'''
+# performance profile applied to each pool connection
+# override with database config or URL query params, e.g:
+#   file:/path/to/db.sqlite?cache_size=-256000&synchronous=full
+PRAGMAS = {
+    # persistent for the database file
+    'journal_mode': 'wal',
+    # safe with WAL: a crash can lose the last commits, not corrupt
+    'synchronous': 'normal',
+    'temp_store': 'memory',
+    # negative: in KiB
+    'cache_size': -64000,
+    'mmap_size': 268435456
+}
+PRAGMA_NAMES = set(PRAGMAS) | {'busy_timeout', 'foreign_keys'}
+# unsafe but fast: a crash during a bulk load can corrupt the database
+BULK_LOAD_PRAGMAS = {
+    'synchronous': 'off'
+}
+PRAGMA_VALUE_REGEX = re.compile(r'^-?\w+$')
+# COPY text format, as used by Postgres:
+# tab-separated fields, newline-separated rows, backslash escapes
+COPY_NULL = '\\N'
+COPY_END = b'\\.'
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'
+})
+COPY_UNESCAPES = {
+    'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'
+}
+COPY_UNESCAPE_REGEX = re.compile(
+    r'\\(?:([0-7]{1,3})|x([0-9a-fA-F]{1,2})|(.))', re.DOTALL
+)
+# virtual machine instructions between statement deadline checks
+PROGRESS_INSTRUCTIONS = 10000
+# rows per executemany call or output write
+COPY_BATCH_SIZE = 10000
+# bytes per read from file sources
+COPY_CHUNK_SIZE = 1 << 20
 
 
 
 def md5sum(t):
+    if t is None:
+        # as in Postgres
+        return None
     t = str(t).encode('utf-8')
     return hashlib.md5(t).hexdigest()
 
 
+class Md5Aggregate(object):
+    """md5 of the comma-separated JSON arrays of each row's values
+
+    Same digest as in Postgres:
+        md5(array_to_string(array_agg(json_build_array(...)), ','))
+    but rows are hashed as they are read instead of concatenated first
+    """
+    def __init__(self):
+        self.hash = hashlib.md5()
+        self.empty = True
+
+    def step(self, *values):
+        if self.empty:
+            self.empty = False
+        else:
+            self.hash.update(b',')
+        self.hash.update(
+            json.dumps(values, ensure_ascii=False).encode('utf-8')
+        )
+
+    def finalize(self):
+        return None if self.empty else self.hash.hexdigest()
+
+
 def json_build_array(*args):
-    return json.dumps(args)
+    # non-ASCII is not escaped, as in Postgres
+    return json.dumps(args, ensure_ascii=False)
+
+
+def get_pragmas(url, pragmas=None):
+    """Split pragma query params from a database URL
+
+    Arguments:
+        url: database URL, e.g. file:/path/to/db.sqlite?mmap_size=0
+        pragmas: pragma overrides from the database config,
+            None values disable a pragma of the default profile
+
+    Returns:
+        (url, pragmas) with the pragma params removed from the URL
+    """
+    result = dict(PRAGMAS)
+    parsed = urlparse(url)
+    query = parse_qs(parsed.query)
+    names = PRAGMA_NAMES.intersection(query)
+    for name in names:
+        result[name] = query.pop(name)[-1]
+    if names:
+        query = urlencode(query, doseq=True)
+        url = url.split('?', 1)[0] + (f'?{query}' if query else '')
+    if pragmas:
+        result.update(pragmas)
+    for name, value in result.items():
+        if not PRAGMA_VALUE_REGEX.match(name) or (
+            value is not None and not PRAGMA_VALUE_REGEX.match(str(value))
+        ):
+            raise Exception(f'invalid value for pragma {name}: {value}')
+    return url, {k: v for k, v in result.items() if v is not None}
+
+
+async def get_pragma(connection, name):
+    async with connection.execute(f'PRAGMA {name}') as cursor:
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def set_pragma(connection, name, value):
+    async with connection.execute(f'PRAGMA {name}={value}'):
+        pass
+
+
+def quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def to_copy_field(value):
+    """Encode a value as a COPY text field"""
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, bytes):
+        # bytea hex format
+        value = f'\\x{value.hex()}'
+    else:
+        value = str(value)
+    return value.translate(COPY_ESCAPES)
+
+
+def unescape_copy(match):
+    octal, hexadecimal, char = match.groups()
+    if octal:
+        return chr(int(octal, 8))
+    if hexadecimal:
+        return chr(int(hexadecimal, 16))
+    return COPY_UNESCAPES.get(char, char)
+
+
+def from_copy_field(field):
+    """Decode a COPY text field"""
+    if field == COPY_NULL:
+        return None
+    if '\\' in field:
+        return COPY_UNESCAPE_REGEX.sub(unescape_copy, field)
+    return field
+
+
+def from_copy_bool(value):
+    if value in ('t', 'f'):
+        return int(value == 't')
+    return value
+
+
+def from_copy_bytes(value):
+    if isinstance(value, str) and value.startswith('\\x'):
+        return bytes.fromhex(value[2:])
+    return value
+
+
+def get_copy_converter(type):
+    """Get a converter for COPY text values that SQLite does not coerce"""
+    type = (type or '').lower()
+    if 'bool' in type:
+        return from_copy_bool
+    if 'blob' in type or 'bytea' in type:
+        return from_copy_bytes
+    return None
+
+
+async def read_copy(source):
+    """Read COPY data in chunks
+
+    Arguments:
+        source: path, file-like object or (async) iterable of bytes
+
+    Yields:
+        lists of rows, each a list of decoded fields
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            async for rows in read_copy(file):
+                yield rows
+        return
+
+    rest = b''
+    async for chunk in get_chunks(source):
+        lines = (rest + bytes(chunk)).split(b'\n')
+        rest = lines.pop()
+        yield [
+            [from_copy_field(f) for f in line.decode('utf-8').split('\t')]
+            for line in lines if line != COPY_END
+        ]
+    if rest and rest != COPY_END:
+        yield [[from_copy_field(f) for f in rest.decode('utf-8').split('\t')]]
+
+
+async def get_chunks(source):
+    if hasattr(source, '__aiter__'):
+        async for chunk in source:
+            yield chunk
+    elif hasattr(source, 'read'):
+        while True:
+            chunk = source.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in source:
+            yield chunk
+
+
+def get_copy_writer(output):
+    """Get a coroutine writing to a file-like object or callback"""
+    write = getattr(output, 'write', output)
+
+    async def writer(data):
+        result = write(data)
+        if inspect.isawaitable(result):
+            await result
+
+    return writer
+
+
+def start_statement(connection):
+    """Set the deadline of a statement about to run, see SqliteStatement"""
+    timeout = getattr(connection, 'statement_timeout', None)
+    connection.deadline = time.monotonic() + timeout if timeout else None
+
+
+@contextmanager
+def statement_deadline(connection):
+    start_statement(connection)
+    try:
+        yield
+    finally:
+        connection.deadline = None
+
+
+class SqliteStatement(object):
+    """Timeout and cancellation for statements on a connection
+
+    Statements are interrupted by the connection's progress handler
+    once past their deadline, or as soon as the task running them
+    is cancelled: otherwise they would keep running in the
+    connection thread
+    """
+    def __init__(self, connection, timeout=None):
+        self.connection = connection
+        self.timeout = timeout
+        self.previous = None
+
+    async def __aenter__(self):
+        connection = self.connection
+        # nested statements restore the outer timeout, see __aexit__
+        self.previous = (
+            getattr(connection, 'statement_timeout', None),
+            getattr(connection, 'deadline', None)
+        )
+        connection.statement_timeout = self.timeout
+        return connection
+
+    async def __aexit__(self, type, value, traceback):
+        previous, self.previous = self.previous, None
+        self.connection.statement_timeout, self.connection.deadline = previous
+        if type is not None and issubclass(type, asyncio.CancelledError):
+            # thread-safe, a no-op if nothing is running
+            self.connection._conn.interrupt()
 
 
 class SqlitePoolContext(object):
-    def __init__(self, url):
-        self.url = url
+    def __init__(self, pool, write=False):
+        self.pool = pool
+        self.write = write
         self.connection = None
-        self.closed = False
 
     async def __aenter__(self):
-        self.connection = await SqliteBackend.connect(self.url)
+        self.connection = await self.pool.get(write=self.write)
         return self.connection
 
     async def __aexit__(self, *args):
-        await self.close()
+        connection, self.connection = self.connection, None
+        await self.pool.put(connection, write=self.write)
 
-    async def close(self):
-        if self.connection and not self.closed:
-            await self.connection.close()
-            self.connection = None
-            self.closed = True
+
+class SqliteTransaction(object):
+    """Transaction context for an autocommit aiosqlite connection
+
+    Nested transactions join the outer transaction
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.nested = False
+
+    async def __aenter__(self):
+        self.nested = self.connection.in_transaction
+        if not self.nested:
+            await self.connection.execute('BEGIN')
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        if self.nested:
+            return
+        if type is None:
+            await self.connection.execute('COMMIT')
+        else:
+            await self.connection.execute('ROLLBACK')
+
+
+class SqliteBulkLoad(object):
+    """Bulk load context for a connection
+
+    Switches to unsafe but fast settings and restores them on exit.
+    Cannot be entered inside a transaction
+    """
+    def __init__(self, connection, pragmas=None):
+        self.connection = connection
+        self.pragmas = BULK_LOAD_PRAGMAS if pragmas is None else pragmas
+        self.previous = {}
+
+    async def __aenter__(self):
+        for name, value in self.pragmas.items():
+            self.previous[name] = await get_pragma(self.connection, name)
+            await set_pragma(self.connection, name, value)
+        return self.connection
+
+    async def __aexit__(self, *args):
+        previous, self.previous = self.previous, {}
+        for name, value in previous.items():
+            await set_pragma(self.connection, name, value)
 
 
 class SqlitePool:
-    # naive pool
-    def __init__(self, url):
-        self.url = url
-        self.acquired = []
+    """Pool of reusable aiosqlite connections
 
-    def acquire(self):
-        context = SqlitePoolContext(self.url)
-        self.acquired.append(context)
-        return context
+    Reads share up to max_size - 1 reader connections.
+    Writes go through a single writer connection, so they queue
+    in the pool instead of contending for the database lock.
+    The database is switched to WAL mode so that readers
+    and the writer do not block each other
 
-    async def close(self):
-        # close any contexts
-        for acquired in self.acquired:
-            await acquired.close()
-        self.acquired = []
+    Each connection is set up with a pragma profile,
+    see PRAGMAS and get_pragmas
+
+    Readers are opened on demand, see warm_up,
+    and closed by check once idle for longer than max_idle seconds
+    """
+    def __init__(
+        self, url, min_size=1, max_size=5, pragmas=None, max_idle=300
+    ):
+        self.url, self.pragmas = get_pragmas(url, pragmas)
+        self.min_size = max(min_size, 0)
+        self.max_size = max(max_size, 2)
+        self.max_idle = max_idle
+        self.idle = collections.deque()
+        # idle connection -> release time
+        self.released = {}
+        self.readers = 0
+        self.available = asyncio.Condition()
+        self.writer = None
+        self.writer_lock = asyncio.Lock()
+        # nested writes must use the writer they hold, see get
+        self.writer_task = None
+        self.initialized = False
+        self.closed = False
+        self.acquires = 0
+        self.waits = 0
+        self.wait_time = 0.
+        self.max_wait = 0.
+        self.evictions = 0
+
+    async def open(self):
+        """Open min_size reader connections"""
+        return await self.warm_up(self.min_size)
+
+    async def warm_up(self, size):
+        """Open reader connections until size are open"""
+        while not self.closed and self.readers < min(size, self.max_size - 1):
+            self.readers += 1
+            try:
+                connection = await self.connect()
+            except BaseException:
+                await self.discard(None)
+                raise
+            await self.put(connection)
+        return self
 
+    async def check(self):
+        """Ping idle connections, closing broken and stale ones
+
+        Readers idle for longer than max_idle are closed
+        down to min_size readers
+
+        Returns:
+            dict with the number of connections checked and evicted
+        """
+        async with self.available:
+            pending, self.idle = self.idle, collections.deque()
+        checked = len(pending)
+        now = time.monotonic()
+        kept = []
+        evicted = 0
+        try:
+            while pending:
+                connection = pending[0]
+                since = self.released.get(connection, now)
+                if (
+                    self.max_idle is not None
+                    and now - since > self.max_idle
+                    and self.readers > self.min_size
+                ):
+                    healthy = False
+                else:
+                    healthy = await self.ping(connection)
+                pending.popleft()
+                if healthy:
+                    kept.append(connection)
+                else:
+                    evicted += 1
+                    await self.discard(connection)
+        finally:
+            # also when cancelled, e.g. by Database.close
+            await self.restore(kept + list(pending))
+
+        if self.writer is not None and not self.writer_lock.locked():
+            checked += 1
+            writer = self.writer
+            if not await self.ping(writer):
+                evicted += 1
+                self.writer = None
+                await self.close_connection(writer)
+        self.evictions += evicted
+        return {'checked': checked, 'evicted': evicted}
+
+    async def restore(self, connections):
+        """Put back idle connections taken out by check"""
+        if self.closed:
+            for connection in connections:
+                self.released.pop(connection, None)
+                await self.close_connection(connection)
+            return
+        async with self.available:
+            # oldest first, as they were
+            self.idle.extendleft(reversed(connections))
+            self.available.notify(len(connections))
+
+    @staticmethod
+    async def ping(connection):
+        try:
+            async with connection.execute('SELECT 1'):
+                pass
+        except Exception:
+            return False
+        return True
+
+    @staticmethod
+    async def close_connection(connection):
+        try:
+            await connection.close()
+        except Exception:
+            # already broken
+            pass
+
+    async def connect(self):
+        connection = await SqliteBackend.connect(self.url)
+        try:
+            for name, value in self.pragmas.items():
+                if name == 'journal_mode' and self.initialized:
+                    # persistent for the database file
+                    continue
+                await set_pragma(connection, name, value)
+        except BaseException:
+            await connection.close()
+            raise
+        self.initialized = True
+        return connection
+
+    def acquire(self, write=False):
+        return SqlitePoolContext(self, write=write)
+
+    async def get(self, write=False):
+        if self.closed:
+            raise Exception('pool is closed')
+        start = time.perf_counter()
+        waited = False
+        if write:
+            self.check_writer()
+            waited = self.writer_lock.locked()
+            await self.writer_lock.acquire()
+            self.writer_task = asyncio.current_task()
+            if self.writer is None:
+                try:
+                    self.writer = await self.connect()
+                except BaseException:
+                    self.release_writer()
+                    raise
+            connection = self.writer
+        else:
+            connection = None
+            async with self.available:
+                while not self.idle and self.readers >= self.max_size - 1:
+                    waited = True
+                    await self.available.wait()
+                if self.idle:
+                    connection = self.idle.pop()
+                    self.released.pop(connection, None)
+                else:
+                    self.readers += 1
+            if connection is None:
+                try:
+                    connection = await self.connect()
+                except BaseException:
+                    await self.discard(None)
+                    raise
+
+        self.acquires += 1
+        if waited:
+            wait = time.perf_counter() - start
+            self.waits += 1
+            self.wait_time += wait
+            self.max_wait = max(self.max_wait, wait)
+        return connection
+
+    def check_writer(self):
+        """Fail if the current task holds the writer
+
+        Waiting for the writer it holds, a task would never return
+        """
+        if self.writer_task is not None and self.writer_task is asyncio.current_task():
+            raise Exception(
+                'sqlite: this task already holds the writer, '
+                'pass its connection to nested writes'
+            )
+
+    async def put(self, connection, write=False):
+        # connections released after close are closed
+        healthy = not self.closed
+        if healthy and connection.in_transaction:
+            # left open by an error
+            try:
+                await connection.rollback()
+            except Exception:
+                healthy = False
+
+        if write:
+            if not healthy:
+                self.writer = None
+                await connection.close()
+            self.release_writer()
+            return
+
+        if healthy:
+            async with self.available:
+                self.idle.append(connection)
+                self.released[connection] = time.monotonic()
+                self.available.notify()
+        else:
+            await self.discard(connection)
+
+    def release_writer(self):
+        self.writer_task = None
+        self.writer_lock.release()
+
+    async def discard(self, connection):
+        if connection is not None:
+            self.released.pop(connection, None)
+            await self.close_connection(connection)
+        async with self.available:
+            self.readers -= 1
+            self.available.notify()
+
+    def get_stats(self):
+        return {
+            'readers': self.readers,
+            'idle': len(self.idle),
+            'writer': self.writer is not None,
+            'acquires': self.acquires,
+            'waits': self.waits,
+            'wait_time': self.wait_time,
+            'max_wait': self.max_wait,
+            'evictions': self.evictions
+        }
+
+    async def close(self):
+        self.closed = True
+        self.released.clear()
+        while self.idle:
+            await self.idle.pop().close()
+        if self.writer is not None and not self.writer_lock.locked():
+            await self.writer.close()
+            self.writer = None
+        # connections in use are closed on release, see put
 
 
 class SqliteBackend(DatabaseBackend):
     """Sqlite backend based on aiosqlite"""
 
     FUNCTIONS = {
-        'group_concat'
+        'group_concat',
+        'md5_agg'
     }
     default_schema = 'main'
+    # SQLITE_MAX_VARIABLE_NUMBER before 3.32
+    max_parameters = 999
+    # pool connections can be acquired for writing
+    has_writer = True
     type = Backend.SQLITE
     dialect = Dialect(
         backend=type,
@@ -108,48 +736,218 @@ class SqliteBackend(DatabaseBackend):
         if 'isolation_level' not in kwargs:
             # autocommit
             kwargs['isolation_level'] = None
+        # once started, the connection thread runs until the connection
+        # is closed: open and set up the connection even if cancelled
+        opening = asyncio.ensure_future(cls.open(*args, **kwargs))
+        try:
+            return await asyncio.shield(opening)
+        except asyncio.CancelledError:
+            try:
+                db = await opening
+            except Exception:
+                pass
+            else:
+                await db.close()
+            raise
+
+    @classmethod
+    async def open(cls, *args, **kwargs):
         db = await connect(*args, **kwargs)
-        await db.create_function('md5', 1, md5sum)
-        await db.create_function('json_build_array', -1, json_build_array)
+        try:
+            # see SqliteStatement
+            db.statement_timeout = db.deadline = None
+
+            def progress():
+                deadline = db.deadline
+                return deadline is not None and time.monotonic() > deadline
+
+            await db._execute(
+                db._conn.set_progress_handler, progress, PROGRESS_INSTRUCTIONS
+            )
+            await db.create_function('md5', 1, md5sum)
+            await db.create_function('json_build_array', -1, json_build_array)
+            # aiosqlite does not wrap create_aggregate
+            await db._execute(
+                db._conn.create_aggregate, 'md5_agg', -1, Md5Aggregate
+            )
+        except BaseException:
+            await db.close()
+            raise
         db.row_factory = Row
         return db
 
     @classmethod
-    async def copy_to_table(cls, connection, table_name, **kwargs):
-        # sqlite copy-to-table: use insert
-        return 'todo'
+    def transaction(cls, connection):
+        return SqliteTransaction(connection)
+
+    @classmethod
+    def statement(cls, connection, timeout=None, default=None):
+        return SqliteStatement(connection, timeout=timeout)
 
     @classmethod
-    async def copy_from_table(cls, connection, table_name, **kwargs):
-        # sqlite copy-from-table: use select
-        return 'todo'
+    def bulk_load(cls, connection, pragmas=None):
+        return SqliteBulkLoad(connection, pragmas=pragmas)
+
+    @staticmethod
+    def check_copy_format(format):
+        if format not in (None, 'text'):
+            raise NotImplementedError(f'sqlite: copy format "{format}"')
 
     @classmethod
-    async def copy_from_query(cls, connection, query, params=None, **kwargs):
-        # sqlite copy-from-query: use select
-        return 'todo'
+    def get_copy_table(cls, table_name, schema_name=None):
+        table = quote(table_name)
+        return f'{quote(schema_name)}.{table}' if schema_name else table
+
+    @classmethod
+    async def copy_to_table(
+        cls,
+        connection,
+        table_name,
+        source=None,
+        columns=None,
+        schema_name=None,
+        format=None,
+        **kwargs
+    ):
+        """Insert COPY text data into a table
+
+        Rows are inserted with executemany in batches,
+        all within one transaction
+
+        Arguments:
+            source: path, file-like object or (async) iterable of bytes,
+                e.g. an AsyncBuffer filled by a Postgres copy_from
+            columns: column names in source order, by default all
+
+        Returns:
+            number of rows copied
+        """
+        cls.check_copy_format(format)
+        types = {
+            row[0]: row[1] for row in await cls.fetch(
+                connection,
+                'SELECT name, type FROM pragma_table_info(?, ?)',
+                [table_name, schema_name or cls.default_schema]
+            )
+        }
+        if not types:
+            raise Exception(f'sqlite: copy to missing table "{table_name}"')
+        columns = columns or list(types)
+        converters = [
+            (i, converter) for i, converter in enumerate(
+                get_copy_converter(types.get(column)) for column in columns
+            ) if converter
+        ]
+        table = cls.get_copy_table(table_name, schema_name)
+        names = ', '.join(quote(column) for column in columns)
+        values = ', '.join('?' * len(columns))
+        insert = f'INSERT INTO {table} ({names}) VALUES ({values})'
+
+        count = 0
+        batch = []
+        async with cls.transaction(connection):
+            async for rows in read_copy(source):
+                for row in rows:
+                    for i, converter in converters:
+                        row[i] = converter(row[i])
+                batch.extend(rows)
+                if len(batch) >= COPY_BATCH_SIZE:
+                    with statement_deadline(connection):
+                        async with connection.executemany(insert, batch):
+                            pass
+                    count += len(batch)
+                    batch = []
+            if batch:
+                with statement_deadline(connection):
+                    async with connection.executemany(insert, batch):
+                        pass
+                count += len(batch)
+        return count
+
+    @classmethod
+    async def copy_from_table(
+        cls, connection, table_name, columns=None, schema_name=None, **kwargs
+    ):
+        """Write a table as COPY text data, see copy_from_query"""
+        names = ', '.join(quote(c) for c in columns) if columns else '*'
+        table = cls.get_copy_table(table_name, schema_name)
+        return await cls.copy_from_query(
+            connection, f'SELECT {names} FROM {table}', **kwargs
+        )
+
+    @classmethod
+    async def copy_from_query(
+        cls, connection, query, params=None, output=None, format=None, **kwargs
+    ):
+        """Write query results as COPY text data
+
+        Arguments:
+            output: path, file-like object or coroutine function,
+                written to in batches of rows
+
+        Returns:
+            number of rows copied
+        """
+        cls.check_copy_format(format)
+        if isinstance(output, (str, os.PathLike)):
+            with open(output, 'wb') as file:
+                return await cls.copy_from_query(
+                    connection, query, params, output=file
+                )
+
+        write = get_copy_writer(output)
+        count = 0
+        lines = []
+        async for row in cls.cursor(
+            connection, query, params, prefetch=COPY_BATCH_SIZE
+        ):
+            lines.append('\t'.join(map(to_copy_field, row)))
+            if len(lines) >= COPY_BATCH_SIZE:
+                await write(('\n'.join(lines) + '\n').encode('utf-8'))
+                count += len(lines)
+                lines = []
+        if lines:
+            await write(('\n'.join(lines) + '\n').encode('utf-8'))
+            count += len(lines)
+        return count
 
     @classmethod
     async def execute(cls, connection, query, params=None):
         params = params or []
-        await connection.execute(query, params)
+        with statement_deadline(connection):
+            async with connection.execute(query, params):
+                pass
         # get changes
         async with connection.execute('select changes()') as cursor:
             row = await cursor.fetchone()
             return row[0]
 
     @classmethod
-    async def cursor(cls, connection, query, params=None):
+    async def cursor(cls, connection, query, params=None, prefetch=None):
         params = params or []
-        async with connection.execute(query, params) as cursor:
-            async for row in cursor:
-                yield row
+        with statement_deadline(connection):
+            async with connection.execute(query, params) as cursor:
+                if prefetch:
+                    cursor.iter_chunk_size = prefetch
+                async for row in cursor:
+                    yield row
+                    # time spent by the consumer does not count
+                    start_statement(connection)
 
     @classmethod
     async def fetch(cls, connection, query, params=None):
         params = params or []
-        async with connection.execute(query, params) as cursor:
-            return await cursor.fetchall()
+        with statement_deadline(connection):
+            async with connection.execute(query, params) as cursor:
+                return await cursor.fetchall()
+
+    @classmethod
+    async def fetch_columns(cls, connection, query, params=None):
+        params = params or []
+        with statement_deadline(connection):
+            async with connection.execute(query, params) as cursor:
+                rows = await cursor.fetchall()
+                return rows, [column[0] for column in cursor.description or ()]
 
     @classmethod
     def get_databases_query(cls, include, tag=None):
@@ -164,28 +962,165 @@ class SqliteBackend(DatabaseBackend):
         return {'select': {'data': {'version': {'sqlite_version': []}}}}
 
     @classmethod
-    async def get_tables(cls, namespace, scope):
-        tables = []
-        query = {
-            'select': {
-                'data': ['tbl_name', 'sql'],
-                'from': 'sqlite_master',
-                'where': {'=': ['type', '`table`']}
+    def get_named_constraints(cls, sql: str):
+        """Get named table constraints from a CREATE TABLE statement
+
+        Returns:
+            dict of (type, columns) -> (name, deferrable, deferred)
+        """
+        result = {}
+        for match in CONSTRAINT_REGEX.finditer(sql or ''):
+            name, type, columns, tail = match.groups()
+            type = CONSTRAINT_TYPES[' '.join(type.upper().split())]
+            columns = tuple(
+                c.strip().strip('"`[]') for c in columns.split(',')
+            )
+            tail = ' '.join(tail.upper().split())
+            result[(type, columns)] = (
+                name,
+                'DEFERRABLE' in tail and 'NOT DEFERRABLE' not in tail,
+                'INITIALLY DEFERRED' in tail
+            )
+        return result
+
+    @classmethod
+    def get_table_definition(
+        cls, name, sql, columns, foreign_keys, indexes, pks=None
+    ):
+        """Get table columns, constraints and indexes from pragma data
+
+        Arguments:
+            name: table name
+            sql: CREATE TABLE statement, used for names and AUTOINCREMENT
+            columns: pragma_table_info rows
+            foreign_keys: pragma_foreign_key_list rows
+            indexes: pragma_index_list rows, with index columns
+            pks: primary key columns by table name, used to resolve
+                foreign keys that reference an implicit primary key
+        """
+        named = cls.get_named_constraints(sql)
+        autoincrement = bool(AUTOINCREMENT_REGEX.search(sql or ''))
+        constraints = []
+        result = {}
+        for column in columns:
+            type = column['type']
+            result[column['name']] = {
+                'name': column['name'],
+                'type': type.lower() if type else None,
+                'default': column['default'],
+                'null': not column['notnull'],
+                'primary': False,
+                'unique': False,
+                'related': None,
+                'sequence': False
             }
+
+        def add_constraint(type, columns, flag, **kwargs):
+            key = (type, tuple(columns))
+            if key in named:
+                constraint_name, deferrable, deferred = named[key]
+            elif len(columns) == 1:
+                # unnamed single-column constraint:
+                # let Table derive the constraint from the column
+                result[columns[0]][type if type != 'foreign' else 'related'] = flag
+                return
+            else:
+                suffix = CONSTRAINT_SUFFIXES[type]
+                constraint_name = f"{name}__{'__'.join(columns)}__{suffix}"
+                deferrable = deferred = False
+            constraint = G(
+                'constraint',
+                type=type,
+                columns=list(columns),
+                deferrable=deferrable,
+                deferred=deferred,
+                **kwargs
+            )
+            constraint['name'] = constraint_name
+            constraints.append(constraint)
+
+        primary = [
+            c['name'] for c in sorted(columns, key=lambda c: c['pk'])
+            if c['pk']
+        ]
+        if primary:
+            add_constraint('primary', primary, True)
+            if autoincrement and len(primary) == 1:
+                # AUTOINCREMENT is only valid on an INTEGER PRIMARY KEY
+                result[primary[0]]['sequence'] = True
+
+        keys = {}
+        for fk in sorted(foreign_keys, key=lambda f: (f['id'], f['seq'])):
+            keys.setdefault(fk['id'], []).append(fk)
+        for fk in keys.values():
+            to = fk[0]['table']
+            by = [f['to'] for f in fk]
+            if None in by and pks:
+                # reference to the related table's primary key
+                by = pks.get(to, by)
+            add_constraint(
+                'foreign',
+                [f['from'] for f in fk],
+                {'to': to, 'by': by},
+                related_name=to,
+                related_columns=by
+            )
+
+        result_indexes = []
+        for index in indexes:
+            origin = index['origin']
+            if origin == 'u':
+                # automatic index backing a UNIQUE constraint
+                add_constraint('unique', index['columns'], True)
+            elif origin == 'c':
+                # CREATE INDEX
+                result_indexes.append({
+                    'name': index['name'],
+                    'type': None,
+                    'primary': False,
+                    'unique': bool(index['unique']),
+                    'columns': [c for c in index['columns'] if c is not None]
+                })
+            # origin "pk": backs the primary key, already handled
+
+        return {
+            'columns': list(result.values()),
+            'constraints': constraints,
+            'indexes': result_indexes
         }
+
+    @classmethod
+    async def get_tables(cls, namespace, scope):
+        tables = []
         database = namespace.database
-        for row in await database.query(query):
-            name = row['tbl_name']
-            sql = row['sql']
-            statement = cls.parse_statement(sql)
-            data = statement['create']['table']
+        rows = []
+        pks = {}
+        for row in await database.query(TABLES_QUERY):
+            name, sql, columns, foreign_keys, indexes = row
+            columns = json.loads(columns)
+            rows.append((
+                name,
+                sql,
+                columns,
+                json.loads(foreign_keys),
+                json.loads(indexes)
+            ))
+            pks[name] = [
+                c['name'] for c in sorted(columns, key=lambda c: c['pk'])
+                if c['pk']
+            ]
+
+        for name, sql, columns, foreign_keys, indexes in rows:
+            data = cls.get_table_definition(
+                name, sql, columns, foreign_keys, indexes, pks=pks
+            )
             try:
                 table = namespace.get_table(
                     name,
                     type='table',
-                    columns=data.get('columns'),
-                    constraints=data.get('constraints'),
-                    indexes=data.get('indexes'),
+                    columns=data['columns'],
+                    constraints=data['constraints'],
+                    indexes=data['indexes'],
                     scope=scope
                 )
             except NotIncluded:
@@ -196,6 +1131,13 @@ class SqliteBackend(DatabaseBackend):
         return tables
 
     @classmethod
-    async def create_pool(cls, url, **kwargs):
-        # ignore kwargs
-        return SqlitePool(url)
+    async def create_pool(
+        cls, url, min_size=1, max_size=5, pragmas=None, max_idle=300, **kwargs
+    ):
+        return await SqlitePool(
+            url,
+            min_size=min_size,
+            max_size=max_size,
+            pragmas=pragmas,
+            max_idle=max_idle
+        ).open()
@@ -1,31 +1,225 @@
-import json
+import time
+from copy import copy
+from collections import OrderedDict
+
+
+MISSING = object()
+
+
+def freeze(key):
+    """Convert a cache key into a hashable equivalent
+
+    dicts become frozensets of (key, value) pairs and lists become tuples,
+    so structurally equal keys hash equally without being serialized.
+    Values that compare equal across types, e.g. True, 1 and 1.0
+    or [1] and (1,), are tagged with their type to keep them apart
+    """
+    if isinstance(key, (bool, float)):
+        return (type(key), key)
+    if isinstance(key, (str, int, type(None))):
+        return key
+    if isinstance(key, dict):
+        return (dict, frozenset((freeze(k), freeze(v)) for k, v in key.items()))
+    if isinstance(key, list):
+        return (list, tuple(freeze(k) for k in key))
+    if isinstance(key, tuple):
+        return (tuple, tuple(freeze(k) for k in key))
+    if isinstance(key, (set, frozenset)):
+        return (set, frozenset(freeze(k) for k in key))
+    return key
+
+
+def copy_result(value):
+    """Copy the mutable containers of a query result
+
+    Rows are immutable and shared; lists, dicts and column arrays
+    are copied, so callers can modify results without changing the cache
+    """
+    if isinstance(value, list):
+        return [copy_result(v) for v in value]
+    if isinstance(value, dict):
+        return {k: copy_result(v) for k, v in value.items()}
+    if hasattr(value, '__setitem__'):
+        # e.g. array.array or numpy arrays
+        return copy(value)
+    return value
+
+
+class CacheBucket(object):
+    """Bounded mapping with LRU eviction and optional TTL
+
+    Arguments:
+        size: maximum number of entries, or None for unbounded
+        ttl: maximum entry age in seconds, or None to never expire
+    """
+
+    def __init__(self, size=None, ttl=None):
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, count=False) is not MISSING
+
+    def get(self, key, default=MISSING, count=True):
+        entry = self._data.get(key, MISSING)
+        if entry is not MISSING:
+            value, expires = entry
+            if expires is None or expires > time.monotonic():
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            # expired
+            del self._data[key]
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        if self.size is not None:
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, MISSING)
+        return default if entry is MISSING else entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else None,
+        }
+
+
+class ResultCache(object):
+    """Query results by query, invalidated by table
+
+    Each entry is indexed by the tables it reads. Writes bump the
+    tables' versions so that results read before a write finished
+    are not cached after it. Results are copied in and out,
+    see copy_result
+
+    Arguments:
+        size: maximum number of results
+        ttl: maximum result age in seconds
+    """
+
+    ALL = '*'
+
+    def __init__(self, size=1024, ttl=60):
+        self.results = CacheBucket(size=size, ttl=ttl)
+        self.tables = {}
+        self.versions = {}
+
+    def __len__(self):
+        return len(self.results)
+
+    def get(self, key):
+        value = self.results.get(key)
+        return value if value is MISSING else copy_result(value)
+
+    def get_versions(self, tables):
+        tables = (self.ALL, ) + tuple(tables)
+        return tuple(self.versions.get(table, 0) for table in tables)
+
+    def set(self, key, value, tables, versions=None):
+        """Cache a result unless its tables changed since versions"""
+        tables = tuple(tables)
+        if versions is not None and versions != self.get_versions(tables):
+            return value
+        self.results.set(key, copy_result(value))
+        for table in tables:
+            self.tables.setdefault(table, set()).add(key)
+        size = self.results.size
+        if size and sum(len(keys) for keys in self.tables.values()) > 2 * size:
+            self.prune()
+        return value
+
+    def invalidate(self, tables):
+        """Drop results that read any of these tables"""
+        if self.ALL in tables:
+            self.versions[self.ALL] = self.versions.get(self.ALL, 0) + 1
+            self.clear()
+            return
+        for table in tables:
+            self.versions[table] = self.versions.get(table, 0) + 1
+            for key in self.tables.pop(table, ()):
+                self.results.pop(key)
+
+    def prune(self):
+        # forget index entries for evicted or expired results
+        for table, keys in list(self.tables.items()):
+            keys = {key for key in keys if key in self.results}
+            if keys:
+                self.tables[table] = keys
+            else:
+                del self.tables[table]
+
+    def clear(self):
+        self.results.clear()
+        self.tables = {}
+
+    def get_stats(self):
+        return self.results.get_stats()
 
 
 class WithCache():
+    # default policy for every bucket
+    # override per bucket with cache_policies, e.g:
+    #   cache_policies = {'models': {'size': 128, 'ttl': 60}}
+    cache_size = 1024
+    cache_ttl = None
+    cache_policies = {}
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.reset()
 
     def get_cache_key(self, key):
-        return json.dumps(key)
+        return freeze(key)
+
+    def get_cache_policy(self, primary):
+        policy = self.cache_policies.get(primary, {})
+        return (
+            policy.get('size', self.cache_size),
+            policy.get('ttl', self.cache_ttl)
+        )
 
     def cache_by(self, primary, secondary, method):
         cache = self._get_secondary(primary)
         secondary = self.get_cache_key(secondary)
 
-        if secondary not in cache:
-            cache[secondary] = method()
-
-        return cache[secondary]
+        value = cache.get(secondary)
+        if value is MISSING:
+            value = cache.set(secondary, method())
+        return value
 
     def _get_secondary(self, primary):
         if not hasattr(self, '_cache'):
             self.reset()
 
-        primary = self.get_cache_key(primary)
-
         if primary not in self._cache:
-            self._cache[primary] = {}
+            size, ttl = self.get_cache_policy(primary)
+            self._cache[primary] = CacheBucket(size=size, ttl=ttl)
 
         return self._cache[primary]
 
@@ -33,10 +227,17 @@ class WithCache():
         cache = self._get_secondary(primary)
         secondary = self.get_cache_key(secondary)
 
-        if secondary not in cache:
-            cache[secondary] = await method()
+        value = cache.get(secondary)
+        if value is MISSING:
+            value = cache.set(secondary, await method())
+        return value
 
-        return cache[secondary]
+    def get_cache_stats(self):
+        if not hasattr(self, '_cache'):
+            return {}
+        return {
+            primary: bucket.get_stats() for primary, bucket in self._cache.items()
+        }
 
     def reset(self):
         self._cache = {}
@@ -0,0 +1,51 @@
+"""Columnar results: rows -> dict of column name -> column values"""
+from array import array
+try:
+    import numpy
+except ImportError:
+    # optional: fall back to array.array
+    numpy = None
+
+
+# fixed-width column types and their array typecode
+TYPECODES = {
+    int: 'q',
+    float: 'd'
+}
+
+
+def to_column(values: tuple):
+    """Convert one column of values
+
+    Returns:
+        numpy array or array.array if the values are all ints or all floats,
+        otherwise a list
+    """
+    types = set(map(type, values))
+    if len(types) == 1:
+        typecode = TYPECODES.get(types.pop())
+        if typecode:
+            try:
+                if numpy is not None:
+                    return numpy.array(values, dtype=typecode)
+                return array(typecode, values)
+            except OverflowError:
+                # ints that do not fit in 64 bits
+                pass
+    return list(values)
+
+
+def to_columns(rows: list, names=None) -> dict:
+    """Convert result rows to columns
+
+    Arguments:
+        rows: list of records, e.g. asyncpg Record or aiosqlite Row
+        names: column names, by default read from the first row
+    """
+    if not rows:
+        return {name: [] for name in names} if names else {}
+    if names is None:
+        names = list(rows[0].keys())
+    # transpose in one pass
+    columns = zip(*rows)
+    return {name: to_column(column) for name, column in zip(names, columns)}
@@ -1,6 +1,9 @@
-from adbc.zql import literal
 import re
+import asyncio
+from adbc.constants import PRIMARY
 
+# most rows per INSERT statement
+BATCH_SIZE = 1000
 
 executors = {}
 def get_executor(source, scope=None):
@@ -122,12 +125,12 @@ class QueryExecutor(object):
                 assert(len(key) == len(pks))
                 ands = []
                 for i, pk in enumerate(pks):
-                    ands.append({'=': [pk, literal(key[i])]})
+                    ands.append({'=': [pk, {'literal': key[i]}]})
 
                 where = {'and': ands}
             else:
                 pk = pks[0]
-                where = {'=': [pk, literal(key)]}
+                where = {'=': [pk, {'literal': key}]}
 
         # add user filters
         wheres = query.data('where')
@@ -140,6 +143,14 @@ class QueryExecutor(object):
 
         return where or None
 
+    def get_primary_key(self, table):
+        # primary key columns, including composite keys
+        # table.pks falls back to all columns if there is no single key
+        for constraint in table.constraints.values():
+            if constraint['type'] == PRIMARY:
+                return list(constraint['columns'])
+        return []
+
     def get_from(self, table, query):
         return table.full_name
 
@@ -233,6 +244,137 @@ class QueryExecutor(object):
             connection=connection
         )
 
+    async def get_many(self, query, keys, **kwargs):
+        """SELECT records by many keys
+
+        Keys are fetched in batches, concurrently within
+        the database's concurrency limit
+
+        Arguments:
+            query: Query
+            keys: list of keys, or key tuples for a composite key
+            batch_size: keys per query (default: BATCH_SIZE)
+            connection: ?connection
+                if set, batches run one after another on it
+
+        Returns:
+            dict of key -> record, without keys that were not found
+        """
+        connection = kwargs.get('connection', None)
+        source = query.data('source')
+        table = await self.database.get_table(source, scope=self.scope)
+        pks = self.get_primary_key(table)
+        if not pks:
+            raise ValueError(f'{table}: cannot get by key without a primary key')
+        if query.data('key') or query.data('field'):
+            raise ValueError('get_many: cannot combine keys with a key or field')
+
+        select = self.get_select(table, query)
+        data = select['select']['data']
+        # include the primary key to map records to keys
+        if isinstance(data, list):
+            select['select']['data'] = data + [pk for pk in pks if pk not in data]
+        elif isinstance(data, dict):
+            select['select']['data'] = dict(
+                data, **{pk: pk for pk in pks if pk not in data}
+            )
+        where = select['select']['where']
+
+        keys = list(keys)
+        array = len(pks) == 1 and self.database.backend.has('array_parameters')
+        size = kwargs.get('batch_size') or BATCH_SIZE
+        if not array:
+            size = self.get_batch_size(pks, size)
+        batches = [keys[i:i + size] for i in range(0, len(keys), size)]
+
+        async def get_batch(batch):
+            if array:
+                # pk = ANY($1): one parameter per batch
+                match = {'=': [pks[0], {'any': {'literal': batch}}]}
+            elif len(pks) == 1:
+                match = {'in': [pks[0], [{'literal': key} for key in batch]]}
+            else:
+                match = {'or': [{'and': [
+                    {'=': [pk, {'literal': k}]} for pk, k in zip(pks, key)
+                ]} for key in batch]}
+            batch_select = {
+                'select': dict(
+                    select['select'],
+                    where={'and': [where, match]} if where else match
+                )
+            }
+            return await self.database.query(batch_select, connection=connection)
+
+        if connection:
+            results = [await get_batch(batch) for batch in batches]
+        else:
+            results = await asyncio.gather(*[get_batch(batch) for batch in batches])
+
+        records = {}
+        for rows in results:
+            for row in rows:
+                if len(pks) == 1:
+                    records[row[pks[0]]] = row
+                else:
+                    records[tuple(row[pk] for pk in pks)] = row
+        return records
+
+    async def iterate(self, query, **kwargs):
+        """SELECT data in table, yielding records in batches
+
+        Uses keyset pagination on the primary key if possible:
+        each batch is a separate query for records after the last key.
+        Otherwise, streams records from a server-side cursor
+
+        Arguments:
+            query: Query
+            batch_size: records per batch (default: BATCH_SIZE)
+            connection: ?connection
+        """
+        connection = kwargs.get('connection', None)
+        batch_size = kwargs.get('batch_size') or BATCH_SIZE
+        source = query.data('source')
+        table = await self.database.get_table(source, scope=self.scope)
+        select = self.get_select(table, query)
+        pks = self.get_primary_key(table)
+        data = select['select']['data']
+        if (
+            not pks
+            or not isinstance(data, list)
+            or not set(pks).issubset(data)
+            or query.data('sort')
+            or query.data('limit')
+            or query.data('key')
+            or query.data('join')
+        ):
+            async for row in self.database.stream(
+                select, connection=connection, prefetch=batch_size
+            ):
+                yield row
+            return
+
+        where = select['select']['where']
+        select['select']['order'] = pks
+        select['select']['limit'] = {'literal': batch_size}
+        while True:
+            rows = await self.database.query(select, connection=connection)
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                break
+            after = self.get_after(pks, rows[-1])
+            select['select']['where'] = {'and': [where, after]} if where else after
+
+    def get_after(self, pks, row):
+        # keyset condition: records after this row, ordered by pks
+        # (a > 1) OR (a = 1 AND b > 2) ...
+        ors = []
+        for i, pk in enumerate(pks):
+            ands = [{'=': [p, {'literal': row[p]}]} for p in pks[:i]]
+            ands.append({'>': [pk, {'literal': row[pk]}]})
+            ors.append({'and': ands} if len(ands) > 1 else ands[0])
+        return {'or': ors} if len(ors) > 1 else ors[0]
+
     def quote(self, value):
         # add literal quoting, unless it is not a string
         # in which case return it directly
@@ -283,70 +425,113 @@ class QueryExecutor(object):
                 cols = set(value.keys())
 
                 if cols != expected:
+                    # missing columns would be set to their defaults
                     raise ValueError(
-                        f'expecting {expected} but got {cols}'
+                        f'values: every row must have columns {columns}, '
+                        f'got {sorted(cols)}'
                     )
 
-                subresult = []
-                for column in columns:
-                    if column not in value:
-                        subresult.append({'default': None})
-                    else:
-                        subresult.append(self.quote(value[column]))
-                result.append(subresult)
+                result.append([self.bind(value[column]) for column in columns])
 
         elif isinstance(values, dict):
             # {"name": "test"}
             columns = list(sorted(values.keys()))
             for column in columns:
-                result.append(self.quote(values[column]))
+                result.append(self.bind(values[column]))
 
         return columns, result
 
+    def bind(self, value):
+        # pass values as parameters, unless they are expressions
+        return value if isinstance(value, dict) else {'literal': value}
+
+    def get_conflict(self, table, columns):
+        # upsert: update all other columns on primary key conflict
+        pks = self.get_primary_key(table)
+        if not pks:
+            raise ValueError(f'{table}: cannot upsert without a primary key')
+        return {
+            'on': pks,
+            'update': [column for column in columns if column not in pks]
+        }
+
+    def get_batch_size(self, columns, batch_size=None):
+        batch_size = batch_size or BATCH_SIZE
+        if columns:
+            # stay within the backend's limit on bound parameters
+            limit = self.database.backend.max_parameters // len(columns)
+            batch_size = min(batch_size, limit)
+        return max(1, batch_size)
+
     async def add(self, query, **kwargs):
         """INSERT data (or update on conflict)
 
-        If there is a key in the query, add an
-        ON CONFLICT (pk) DO UPDATE to simulate upsert
+        Lists of values are inserted in batches of multi-row
+        statements with bound parameters, all in one transaction
 
         Arguments:
             query: Query
             connection: ?connection
                 useful for transactions
+            upsert: if True, add an ON CONFLICT (pk) DO UPDATE
+                to update existing records (default: False)
+            batch_size: most rows per statement (default: BATCH_SIZE)
+                also limited by the backend's parameter limit
 
         Returns:
-            numbers of records modified
+            numbers of records modified, or records if fields are taken
         """
-        # TODO: convert to zql
         values = query.data('values')
         connection = kwargs.get('connection')
         zql = kwargs.get('zql', False)
-        # TODO: support ON CONFLICT
-        # upsert = kwargs.get('upsert', True)
+        upsert = kwargs.get('upsert', False)
 
         # values is either a list or dict or None
-        rows = 1
-        if isinstance(values, list):
-            # [{'name': 'kay'}, {'name': 'jay'}]
-            rows = len(values)
+        many = isinstance(values, list) and len(values) > 1
 
         source = query.data('source')
         table = await self.database.get_table(source, scope=self.scope)
         returning = self.get_returning(table, query)
         columns, values = self.get_values(values)
+        conflict = self.get_conflict(table, columns) if upsert else None
 
-        query = {
+        batches = [values]
+        if many:
+            # [{'name': 'kay'}, {'name': 'jay'}]
+            size = self.get_batch_size(columns, kwargs.get('batch_size'))
+            batches = [
+                values[i:i + size] for i in range(0, len(values), size)
+            ]
+
+        queries = [{
             'insert': {
                 'table': table.full_name,
                 'return': returning,
                 'columns': columns,
-                'values': values
+                'values': batch,
+                'conflict': conflict
             }
-        }
+        } for batch in batches]
         if zql:
-            return query
+            return queries[0] if len(queries) == 1 else queries
+
+        if len(queries) == 1:
+            return await self._add(
+                queries[0], returning, many, connection=connection
+            )
+
+        result = [] if returning else 0
+        async with self.database.transaction(connection) as conn:
+            for query in queries:
+                result += await self._add(
+                    query, returning, many, connection=conn
+                )
+        return result
+
+    async def _add(self, query, returning, many, connection=None):
+        rows = len(query['insert']['values']) if many else 1
         if returning:
-            method = 'query' if rows > 1 else 'query_one_row'
+            method = 'query' if many else 'query_one_row'
         else:
             method = 'execute'
         result = await getattr(self.database, method)(
@@ -365,10 +550,17 @@ class QueryExecutor(object):
             count: ?string
             connection: ?connection
                 useful for transactions
+            by: ?union[str, list]
+                if set, values is a list of rows and each row
+                updates the record that matches it on these columns,
+                see set_many
 
         Returns:
             number of records updated
         """
+        if kwargs.get('by'):
+            return await self.set_many(query, **kwargs)
+
         # TODO: convert to zql
         field = query.data('field')
         values = query.data('values')
@@ -407,6 +599,150 @@ class QueryExecutor(object):
             result = self.get_changed_rows(result)
         return result
 
+    VALUES_ALIAS = '_values'
+
+    async def set_many(self, query, **kwargs):
+        """UPDATE many records to different values
+
+        Backends that support UPDATE ... FROM join the table to batches
+        of VALUES; others load the values into a temporary table first
+
+        Arguments:
+            query: Query
+            by: union[str, list]
+                columns that identify a record, e.g. "id"
+            connection: ?connection
+            batch_size: most rows per statement (default: BATCH_SIZE)
+
+        Returns:
+            number of records updated
+        """
+        values = query.data('values')
+        connection = kwargs.get('connection')
+        zql = kwargs.get('zql', False)
+        by = kwargs['by']
+        if isinstance(by, str):
+            by = [by]
+        if isinstance(values, dict):
+            values = [values]
+        if not values or not isinstance(values, list):
+            raise ValueError('set: expecting a list of values')
+        if query.data('key') or query.data('where') or query.data('field'):
+            raise ValueError('set: cannot combine "by" with a key, field or where')
+
+        source = query.data('source')
+        table = await self.database.get_table(source, scope=self.scope)
+        columns, values = self.get_values(values)
+        missing = set(by) - set(columns)
+        if missing:
+            raise ValueError(f'set: values are missing {missing}')
+        set_ = [column for column in columns if column not in by]
+        if not set_:
+            raise ValueError('set: no values to set')
+
+        size = self.get_batch_size(columns, kwargs.get('batch_size'))
+        batches = [values[i:i + size] for i in range(0, len(values), size)]
+        if self.database.backend.has('update_from'):
+            queries = self.get_update_from(table, by, set_, columns, batches)
+        else:
+            queries = self.get_update_temporary(table, by, set_, columns, batches)
+        if zql:
+            return queries
+
+        result = 0
+        async with self.database.transaction(connection) as conn:
+            for query in queries:
+                changed = await self.database.execute(query, connection=conn)
+                if 'update' in query:
+                    result += self.get_changed_rows(changed)
+        return result
+
+    def get_update_from(self, table, by, set_, columns, batches):
+        # UPDATE table SET ... FROM (VALUES ...) AS _values (...) WHERE ...
+        alias = self.VALUES_ALIAS
+        name = table.full_name
+        types = [table.columns[column]['type'] for column in columns]
+        where = [{'=': [f'{name}.{b}', f'{alias}.{b}']} for b in by]
+        where = {'and': where} if len(where) > 1 else where[0]
+        set_ = {column: f'{alias}.{column}' for column in set_}
+        return [{
+            'update': {
+                'table': name,
+                'set': set_,
+                'from': {
+                    alias: {
+                        # VALUES parameters are untyped
+                        'values': [[
+                            {'cast': [value, type]} if type else value
+                            for value, type in zip(row, types)
+                        ] for row in batch],
+                        'columns': columns
+                    }
+                },
+                'where': where
+            }
+        } for batch in batches]
+
+    def get_update_temporary(self, table, by, set_, columns, batches):
+        # load values into a temporary table,
+        # then UPDATE table SET x = (SELECT x FROM temporary ...)
+        name = table.full_name
+        temporary = f'{table.name}_{self.VALUES_ALIAS}'
+        alias = self.VALUES_ALIAS
+        where = [{'=': [f'{name}.{b}', f'{alias}.{b}']} for b in by]
+        where = {'and': where} if len(where) > 1 else where[0]
+        from_ = {alias: f'temp.{temporary}'}
+
+        queries = [{
+            'create': {
+                'table': {
+                    'name': temporary,
+                    'temporary': True,
+                    'columns': [{
+                        'name': column,
+                        'type': table.columns[column]['type']
+                    } for column in columns],
+                    'constraints': [{
+                        'name': f'{temporary}__uk',
+                        'type': 'unique',
+                        'columns': by
+                    }]
+                }
+            }
+        }]
+        queries.extend({
+            'insert': {
+                'table': f'temp.{temporary}',
+                'columns': columns,
+                'values': batch,
+                # last row wins, as with UPDATE ... FROM
+                'conflict': {'on': by, 'update': set_}
+            }
+        } for batch in batches)
+        queries.append({
+            'update': {
+                'table': name,
+                'set': set_ + [{
+                    'select': {
+                        'data': [f'{alias}.{column}' for column in set_],
+                        'from': from_,
+                        'where': where
+                    }
+                }],
+                'where': {
+                    'exists': {
+                        'select': {
+                            'data': f'{alias}.{by[0]}',
+                            'from': from_,
+                            'where': where
+                        }
+                    }
+                }
+            }
+        })
+        queries.append({'drop': {'table': f'temp.{temporary}'}})
+        return queries
+
     async def delete(self, query, **kwargs):
         """DELETE data
 
@@ -16,6 +16,13 @@ class Loggable(object):
                 kwargs.get('log_level', getattr(self, '_log_level', logging.INFO))
             )
 
+    def is_logging(self, level=logging.DEBUG):
+        """Whether log output at this level would go anywhere
+
+        Use to skip building expensive log messages
+        """
+        return getattr(self, 'verbose', False) or self._logger.isEnabledFor(level)
+
     def log(self, *args, **kwargs):
         if self.verbose:
             print(*args)
@@ -1,10 +1,12 @@
 import io
 from math import ceil
-from asyncio import gather
+from collections import Counter
+from asyncio import gather, ensure_future
 from jsondiff.symbols import insert, delete
 from adbc.utils import AsyncBuffer, aecho, confirm, print_query
 from adbc.constants import SEP, SEPN
 from adbc.zql import build
+from adbc.retry import retry
 from .merge import WithMerge
 from .drop import WithDrop
 from .create import WithCreate
@@ -32,77 +34,104 @@ class WithCopy(WithMerge, WithDrop, WithCreate, WithDiff):
         # md5 check failed
         # copy this shard
 
-        # maybe use transaction for delete?
-        # if there are no FK constraints, it shouldn't block
-        # but we would still get a more consistent table state
-        # for example, row counts will not change as large chunks of rows
-        # are deleted and re-added in a transaction
-
-        connection = None  # await self.get_connection() if delete else None
-        transaction = aecho()  # connection.transaction() if delete else aecho()
+        # delete and copy in one target transaction:
+        # row counts do not change as chunks of rows are deleted and re-added,
+        # and a shard that fails with a transient error can be retried
+        return await retry(
+            self._copy_shard_once,
+            source_model,
+            target_model,
+            target,
+            pk,
+            target_schema,
+            target_table,
+            delete,
+            truncate,
+            cursor_min,
+            cursor_max,
+            policies={**target.retry_policies, **self.retry_policies},
+            on_retry=target.on_retry
+        )
 
+    async def _copy_shard_once(
+        self,
+        source_model,
+        target_model,
+        target,
+        pk,
+        target_schema,
+        target_table,
+        delete,
+        truncate,
+        cursor_min,
+        cursor_max,
+    ):
         def get_query(q):
             columns = q.table.order_by_alias(
                 q.table.columns.keys()
             )
             q = q.take(*columns)
-            if cursor_min:
+            if cursor_min is not None:
                 q = q.where({
                     "and": [
-                        {'>': [pk, cursor_min]},
-                        {'<=': [pk, cursor_max]}
+                        {'>': [pk, {'literal': cursor_min}]},
+                        {'<=': [pk, {'literal': cursor_max}]}
                     ]
                 })
             else:
-                q = q.where({'<=': [pk, cursor_max]})
+                q = q.where({'<=': [pk, {'literal': cursor_max}]})
             return q
 
-        try:
-            async with transaction:
-                source_query = get_query(source_model)
-                if delete:
-                    if truncate:
-                        await target_model.truncate()
-                    else:
-                        target_query = get_query(target_model)
-                        await target_query.delete(connection=connection)
-
-                target_columns = target_model.table.order_by_alias(
-                    target_model.table.columns.keys()
-                )
-                # copy from source to buffer
-                source_query = await source_query.get(zql=True)
-                if self.parallel_copy:
-                    buffer = AsyncBuffer()
-                    copy_from, copy_to = await gather(
-                        self.copy_from(
-                            query=source_query,
-                            output=buffer.write,
-                            close=buffer
-                        ),
-                        target.copy_to(
-                            table_name=target_table,
-                            schema_name=target_schema,
-                            source=buffer,
-                            connection=connection,
-                            columns=target_columns,
-                        ),
-                    )
-                    return copy_to
+        async with target.transaction() as connection:
+            source_query = get_query(source_model)
+            if delete:
+                if truncate:
+                    await target_model.truncate(connection=connection)
                 else:
-                    buffer = io.BytesIO()
-                    await self.copy_from(query=source_query, output=buffer)
-                    buffer.seek(0)
-                    return await target.copy_to(
+                    target_query = get_query(target_model)
+                    await target_query.delete(connection=connection)
+
+            target_columns = target_model.table.order_by_alias(
+                target_model.table.columns.keys()
+            )
+            # copy from source to buffer
+            source_query = await source_query.get(zql=True)
+            if self.parallel_copy:
+                buffer = AsyncBuffer()
+                copiers = [
+                    ensure_future(self.copy_from(
+                        query=source_query,
+                        output=buffer.write,
+                        close=buffer
+                    )),
+                    ensure_future(target.copy_to(
                         table_name=target_table,
                         schema_name=target_schema,
                         source=buffer,
-                        columns=target_columns,
                         connection=connection,
-                    )
-        finally:
-            if connection:
-                await connection.close()
+                        columns=target_columns,
+                    ))
+                ]
+                try:
+                    copy_from, copy_to = await gather(*copiers)
+                except BaseException:
+                    # stop the other side before the transaction ends
+                    for copier in copiers:
+                        copier.cancel()
+                    await gather(*copiers, return_exceptions=True)
+                    raise
+                return copy_to
+            else:
+                buffer = io.BytesIO()
+                await self.copy_from(query=source_query, output=buffer)
+                buffer.seek(0)
+                return await target.copy_to(
+                    table_name=target_table,
+                    schema_name=target_schema,
+                    source=buffer,
+                    columns=target_columns,
+                    connection=connection,
+                )
 
     async def _copy_table(
         self,
@@ -164,11 +193,11 @@ class WithCopy(WithMerge, WithDrop, WithCreate, WithDiff):
 
             # if there is a pk, we are using keyset pagination
             # only delete rows not within the bounds of the source data
-            if pk and shard == 0 and source_low:
+            if pk and shard == 0 and source_low is not None:
                 # drop any target rows with id before the lowest source ID
-                await target_model.where({'<': [pk, source_low]}).delete()
+                await target_model.where({'<': [pk, {'literal': source_low}]}).delete()
 
-            if pk and (target_high is None or cursor and cursor > target_high):
+            if pk and (target_high is None or cursor is not None and cursor > target_high):
                 # skip the check and move on to delete/copy
                 # if the cursor is beyond the highest target ID
 
@@ -241,7 +270,7 @@ class WithCopy(WithMerge, WithDrop, WithCreate, WithDiff):
 
             if not single and pk and shard == last:
                 # drop after the last shard
-                await target_model.where({'>': [pk, source_high]}).delete()
+                await target_model.where({'>': [pk, {'literal': source_high}]}).delete()
 
             cursor = source_max
 
@@ -353,6 +382,8 @@ class WithCopy(WithMerge, WithDrop, WithCreate, WithDiff):
     async def copy(
         self, target, scope=None, check_all=True, final_diff=True, exclude=None
     ):
+        databases = [self] if target is self else [self, target]
+        retries = sum((db.retries for db in databases), Counter())
         schema_diff = await self.diff(
             target,
             scope=scope,
@@ -386,19 +417,20 @@ class WithCopy(WithMerge, WithDrop, WithCreate, WithDiff):
 
         if final_diff:
             final_diff = await self.diff(target, scope=scope, exclude=exclude)
+        # retries of transient errors during this copy, by error class
+        retries = sum((db.retries for db in databases), Counter()) - retries
         return {
             "schema_changes": schema_changes,
             "data_changes": data_changes,
             "final_diff": final_diff,
+            "retries": dict(retries),
         }
 
     async def copy_from(self, **kwargs):
-        pool = await self.pool
         table_name = kwargs.pop("table_name", None)
         schema_name = kwargs.get('schema_name', None)
         transaction = kwargs.pop("transaction", False)
-        connection = kwargs.pop("connection", self._connection)
-        connection = aecho(connection) if connection else pool.acquire()
+        connection = kwargs.pop("connection", None)
         close = kwargs.pop("close", False)
         query = kwargs.pop("query", None)
         params = kwargs.pop('params', None)
@@ -410,19 +442,37 @@ class WithCopy(WithMerge, WithDrop, WithCreate, WithDiff):
                 raise NotImplementedError("table or query is required")
             if isinstance(query, (list, dict)):
                 # compile from zQL
-                query, params = build(query, dialect=self.backend.dialect, combine=True)
+                query, params = build(
+                    query, dialect=self.backend.dialect, combine=True, cache=True
+                )
 
             target_label = print_query(query, params)
 
+        replica = await self.get_replica(
+            None if table_name else [(query, params)],
+            connection,
+            {table_name} if table_name else None
+        )
+        if replica:
+            return await replica.copy_from(
+                table_name=table_name,
+                query=query,
+                params=params,
+                transaction=transaction,
+                close=close,
+                **kwargs
+            )
 
+        pool = await self.pool
+        connection = self.acquire(pool, connection or self._connection)
         if self.prompt:
             if not confirm(f"{self.name} ({self.tag}): {SEP}copy from {target_label}{SEPN}", True):
                 raise Exception(f"{self}: copy_from aborted")
         else:
             self.log(f"{self}: copy_from{SEP}{target_label}{SEPN}")
 
-        async with connection as conn:
-            transaction = conn.transaction() if transaction else aecho()
+        async with connection as conn, self.statement(conn):
+            transaction = self.backend.transaction(conn) if transaction else aecho()
             async with transaction:
                 result = None
                 if table_name:
@@ -449,8 +499,9 @@ class WithCopy(WithMerge, WithDrop, WithCreate, WithDiff):
         columns = ', '.join(kwargs.get('columns', []))
         columns = f' ({columns})' if columns else ''
         target_label = f"{schema_name}.{table_name}{columns}" if schema_name else table_name
-        connection = kwargs.pop("connection", None) or self._connection
-        connection = aecho(connection) if connection else pool.acquire()
+        connection = self.acquire(
+            pool, kwargs.pop("connection", None) or self._connection, write=True
+        )
 
         if self.prompt:
             if not confirm(f"{self.name} ({self.tag}): {SEP}copy to {target_label}{SEPN}", True):
@@ -458,7 +509,10 @@ class WithCopy(WithMerge, WithDrop, WithCreate, WithDiff):
         else:
             self.log(f"{self}: copy_to{SEP}{target_label}{SEPN}")
 
-        async with connection as conn:
-            transaction = conn.transaction() if transaction else aecho()
-            async with transaction:
-                return await self.backend.copy_to_table(conn, table_name, **kwargs)
+        try:
+            async with connection as conn, self.statement(conn):
+                transaction = self.backend.transaction(conn) if transaction else aecho()
+                async with transaction:
+                    return await self.backend.copy_to_table(conn, table_name, **kwargs)
+        finally:
+            self.wrote({table_name})
@@ -10,13 +10,36 @@ class WithInfo(object):
         schema=True,
         hashes=False,
         exclude=None,
+        progress=None,
     ):
+        """Get info for each child
+
+        Arguments:
+            progress: ?callable(child, done, total)
+                called as each child completes, and passed down
+                so that nested children report progress too
+        """
         result = OrderedDict()
         children = await self.get_children(scope=scope)
-        for child in children:
-            result[child.alias] = child.get_info(
-                data=data, schema=schema, hashes=hashes, exclude=exclude
+        total = len(children)
+        done = 0
+
+        async def get_child_info(child):
+            nonlocal done
+            info = await child.get_info(
+                data=data,
+                schema=schema,
+                hashes=hashes,
+                exclude=exclude,
+                progress=progress
             )
+            done += 1
+            if progress:
+                progress(child, done, total)
+            return info
+
+        for child in children:
+            result[child.alias] = get_child_info(child)
 
         keys, values = result.keys(), result.values()
         values = await gather(*values)
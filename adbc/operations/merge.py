@@ -257,15 +257,17 @@ class WithMerge(WithAlterPreQL):
 
     async def merge_table(self, table_name, diff, parents=None, scope=None):
         parents = parents + [table_name]
-        return {
-            plural: await self.merge(diff[plural], child, parents, parallel=False, scope=scope)
-            for child, plural in (
-                ("column", "columns"),
-                ("constraint", "constraints"),
-                ("index", "indexes"),
-            )
-            if diff.get(plural)
-        }
+        # one transaction per table, with few round trips
+        async with self.batch():
+            return {
+                plural: await self.merge(diff[plural], child, parents, parallel=False, scope=scope)
+                for child, plural in (
+                    ("column", "columns"),
+                    ("constraint", "constraints"),
+                    ("index", "indexes"),
+                )
+                if diff.get(plural)
+            }
 
     async def merge_schema(self, schema_name, diff, parents=None, scope=None):
         # merge schemas in diff (have tables in common but not identical)
@@ -1,5 +1,4 @@
-from .utils import merge as _merge
-from copy import deepcopy
+from .utils import merged
 from .exceptions import QueryValidationError, QueryExecutionError
 from .executors import get_executor
 
@@ -66,6 +65,26 @@ class Query(object):
     async def get(self, key=None, field=None, **kwargs):
         return await self._call("get", key=key, field=field, **kwargs)
 
+    # SELECT, by many keys
+    async def get_many(self, keys, **kwargs):
+        """Get records by key, as a dict of key -> record"""
+        query = self if self.data("method") == "get" else self.method("get")
+        return await self.executor.get_many(query, keys, **kwargs)
+
+    # SELECT, in batches
+    def iterate(self, batch_size=None, **kwargs):
+        """Iterate over records without loading them all at once
+
+        Example:
+            async for user in model.where(active=True).iterate(batch_size=500):
+                ...
+        """
+        query = self if self.data("method") == "get" else self.method("get")
+        return self.executor.iterate(query, batch_size=batch_size, **kwargs)
+
+    def __aiter__(self):
+        return self.iterate()
+
     # SELECT
     async def one(self, key=None, field=None, **kwargs):
         return await self._call("one", key=key, field=field, **kwargs)
@@ -152,21 +171,16 @@ class Query(object):
         return self._update({'take': options}, level=level, merge=True)
 
     async def _call(self, method, key=None, field=None, **kwargs):
+        # one state update for method, key and field
+        args = {}
         if self.data("method") != method:
-            return await getattr(self.method(method), method)(
-                key=key, field=field, **kwargs
-            )
-
-        if key or field:
-            # redirect back through copy
-            args = {}
-            if key:
-                args["key"] = key
-            if field:
-                args["field"] = field
-            return await getattr(self._update(args), method)(**kwargs)
-
-        return await self.execute(**kwargs)
+            args["method"] = method
+        if key is not None:
+            args["key"] = key
+        if field is not None:
+            args["field"] = field
+        query = self._update(args) if args else self
+        return await query.execute(**kwargs)
 
     def validate_where(self, level, query):
         return True
@@ -229,12 +243,17 @@ class Query(object):
         return str(self.state)
 
     def _update(self, args=None, level=None, merge=False, copy=True, **kwargs):
+        """Update the query state
+
+        Copy-on-write: only the dicts along the updated path are copied,
+        the rest of the state is shared with this query,
+        so state must never be modified in place
+        """
         if args:
             kwargs = args
 
-        state = None
         if copy:
-            state = deepcopy(self.state)
+            state = dict(self.state)
         else:
             state = self.state
 
@@ -243,22 +262,18 @@ class Query(object):
         # default: adjust root level
         if level:
             for part in level.split("."):
-                try:
-                    new_sub = sub[part]
-                except KeyError:
-                    sub[part] = {}
-                    sub = sub[part]
-                else:
-                    if isinstance(new_sub, bool):
-                        sub[part] = {}
-                        sub = sub[part]
-                    else:
-                        sub = new_sub
+                new_sub = sub.get(part)
+                if new_sub is None or isinstance(new_sub, bool):
+                    new_sub = {}
+                elif copy:
+                    new_sub = dict(new_sub)
+                sub[part] = new_sub
+                sub = new_sub
 
         for key, value in kwargs.items():
-            if merge and isinstance(value, dict) and sub.get(key):
-                # deep merge
-                _merge(value, sub[key])
+            if merge and isinstance(value, dict) and isinstance(sub.get(key), dict):
+                # deep merge, new values win
+                sub[key] = merged(sub[key], value)
             else:
                 # shallow merge, assign the state
                 sub[key] = value
@@ -0,0 +1,66 @@
+"""Retries for idempotent operations that fail with transient errors"""
+import random
+import asyncio
+
+
+class RetryPolicy(object):
+    """How often and how long to retry an error class
+
+    Delays grow exponentially, with full jitter:
+        uniform(0, min(cap, base * 2 ** attempt))
+    """
+
+    def __init__(self, retries=3, base=0.1, cap=5.):
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+
+    def get_delay(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
+# transient errors for any backend, see DatabaseBackend.retry_policies
+RETRY_POLICIES = {
+    # e.g. ConnectionResetError, BrokenPipeError
+    ConnectionError: RetryPolicy(retries=3, base=0.5)
+}
+
+
+def get_policy(error, policies):
+    """Get the policy for the closest class of an error, if any
+
+    Errors re-raised from another error, e.g. by Database.query,
+    use the policy of their cause
+    """
+    while error is not None:
+        for cls in type(error).__mro__:
+            policy = policies.get(cls)
+            if policy is not None:
+                return policy
+        error = error.__cause__
+    return None
+
+
+async def retry(operation, *args, policies=None, on_retry=None, **kwargs):
+    """Await an operation, retrying errors that have a policy
+
+    Arguments:
+        operation: coroutine function, called again for each attempt
+        policies: dict of error class -> RetryPolicy
+        on_retry: called with (error, attempt, delay) before each retry
+    """
+    if policies is None:
+        policies = RETRY_POLICIES
+    attempt = 0
+    while True:
+        try:
+            return await operation(*args, **kwargs)
+        except Exception as e:
+            policy = get_policy(e, policies)
+            if policy is None or attempt >= policy.retries:
+                raise
+            delay = policy.get_delay(attempt)
+            attempt += 1
+            if on_retry:
+                on_retry(e, attempt, delay)
+            await asyncio.sleep(delay)
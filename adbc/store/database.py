@@ -1,17 +1,41 @@
 import os
+import re
+import time
+import asyncio
+import itertools
+import collections
+from contextlib import asynccontextmanager
 from cached_property import cached_property
 from pprint import pformat
 from adbc.exceptions import NotIncluded
 from adbc.scope import WithScope
-from adbc.utils import get_version_number, confirm, aecho, print_query
+from adbc.utils import (
+    get_version_number, confirm, aecho, print_query,
+    FairSemaphore, LimitedContext, statement_timeout, statement_batch
+)
 from adbc.query import TableModel
 from adbc.operations.apply import WithApply
 from adbc.logging import Loggable
 from adbc.constants import SEP, SEPN
 from adbc.zql import build
+from adbc.zql.utils import get_tables
+from adbc.cache import ResultCache, freeze, MISSING
+from adbc.columns import to_columns
+from adbc.retry import retry
 from .namespace import Namespace
+from .pools import pools
+from .replicas import ReplicaSet
 
 SKIP_CA_CHECK = os.environ.get('ADBC_SKIP_CA_CHECK') == '1'
+# process-wide query counter, used to correlate query log records
+QUERY_IDS = itertools.count(1)
+# rows per chunk when streaming columns
+STREAM_CHUNK_SIZE = 1000
+# statements per call when executing a batch, see Database.batch
+BATCH_SIZE = 500
+# SQL that is safe to run on a read replica
+READ_ONLY_REGEX = re.compile(r'^\s*(select|values|show)\b', re.IGNORECASE)
+LOCKING_REGEX = re.compile(r'\bfor\s+(no\s+key\s+)?(update|share)\b', re.IGNORECASE)
 
 
 class Database(Loggable, WithApply, WithScope):
@@ -28,8 +52,16 @@ class Database(Loggable, WithApply, WithScope):
         alias=None,
         verbose=False,
         prompt=False,
-        min_pool_size=5,
+        min_pool_size=1,
         max_pool_size=20,
+        pool_max_idle=300,
+        health_check_interval=None,
+        retry_policies=None,
+        timeout=None,
+        concurrency=None,
+        result_cache=None,
+        pragmas=None,
+        replicas=None,
         **kwargs
     ):
         if url and not host:
@@ -46,6 +78,27 @@ class Database(Loggable, WithApply, WithScope):
         self.scope = scope
         self.min_pool_size = min_pool_size
         self.max_pool_size = max_pool_size
+        # seconds before idle pool connections are closed
+        self.pool_max_idle = pool_max_idle
+        # seconds between pool health checks, see check_pool
+        self.health_check_interval = health_check_interval
+        # maximum number of queries in flight, shared fairly across tables
+        self.concurrency = concurrency or max_pool_size
+        self.limiter = FairSemaphore(self.concurrency)
+        # opt-in cache for ZQL read results, e.g. {"size": 256, "ttl": 30}
+        # invalidated by ZQL writes made through this database
+        self.results = None
+        if result_cache:
+            options = result_cache if isinstance(result_cache, dict) else {}
+            self.results = ResultCache(**options)
+        # statement timeout in seconds, see get_timeout
+        self.timeout = timeout
+        # error class -> RetryPolicy, by default the backend's
+        self._retry_policies = retry_policies
+        # error class name -> number of retries
+        self.retries = collections.Counter()
+        # SQLite connection pragmas, e.g. {"cache_size": -256000}
+        self.pragmas = pragmas
         self.url = url
         self.prompt = prompt
         self.alias = alias or name
@@ -53,7 +106,18 @@ class Database(Loggable, WithApply, WithScope):
         self.verbose = verbose
         self.tag = tag
         self._pool = None
+        self._pool_key = None
         self._connection = None
+        self._warming = None
+        self._checking = None
+        # read replicas: list of URLs, or dict of "urls" and ReplicaSet options
+        self.replicas = None
+        if replicas:
+            options = dict(replicas) if isinstance(replicas, dict) else {'urls': replicas}
+            urls = options.pop('urls')
+            self.replicas = ReplicaSet(
+                [self.create_replica(url) for url in urls], **options
+            )
 
     def __str__(self):
         return self.name
@@ -63,12 +127,88 @@ class Database(Loggable, WithApply, WithScope):
         return 16000
 
     async def close(self):
+        tasks = [task for task in (self._warming, self._checking) if task]
+        for task in tasks:
+            task.cancel()
+        self._warming = self._checking = None
+        # they return the connections they hold to the pool
+        await asyncio.gather(*tasks, return_exceptions=True)
         if self._pool:
-            await self._pool.close()
+            # shared with other databases, see pools.PoolRegistry
             self._pool = None
+            await pools.release(self._pool_key)
         if self._connection:
             await self._connection.close()
             self._connection = None
+        if self.replicas:
+            await self.replicas.close()
+
+    def create_replica(self, url):
+        """Get a read replica with the same settings as this database"""
+        return Database(
+            url=url,
+            name=self.name,
+            scope=self.scope,
+            tag=self.tag,
+            alias=self.alias,
+            verbose=self.verbose,
+            prompt=self.prompt,
+            min_pool_size=self.min_pool_size,
+            max_pool_size=self.max_pool_size,
+            pool_max_idle=self.pool_max_idle,
+            retry_policies=self._retry_policies,
+            timeout=self.timeout,
+            concurrency=self.concurrency,
+            pragmas=self.pragmas,
+            logger=self._logger
+        )
+
+    async def get_replica(self, queries=None, connection=None, tables=None):
+        """Get the replica to run read-only queries on
+
+        Queries on an explicit connection, e.g. in a transaction,
+        stay on the primary, as do queries that may write or lock
+        and queries of tables written recently, see wrote
+
+        Arguments:
+            queries: list of (query, params), None for table reads
+            tables: names of the tables read, None if unknown
+
+        Returns:
+            replica Database, or None to use this database
+        """
+        if not self.replicas or connection or self._connection:
+            return None
+        if queries and not all(self.is_read_only(query) for query, _ in queries):
+            return None
+        if self.replicas.is_written(tables):
+            return None
+        return await self.replicas.get()
+
+    def wrote(self, tables=None):
+        """Record ZQL or SQL writes to tables, None if unknown
+
+        Cached results that read them are dropped, and reads of them
+        stay on the primary for a while, see ReplicaSet.is_written.
+        Unknown tables, e.g. of SQL writes, may be any table
+        """
+        if self.results is not None:
+            self.results.invalidate(
+                {ResultCache.ALL} if tables is None else tables
+            )
+        if self.replicas:
+            self.replicas.wrote(tables)
+
+    @property
+    def tracks_tables(self):
+        # tables are only needed by the result cache and replicas
+        return self.results is not None or bool(self.replicas)
+
+    @staticmethod
+    def is_read_only(query):
+        return bool(
+            READ_ONLY_REGEX.match(query) and not LOCKING_REGEX.search(query)
+        )
 
     async def get_model(self, table_name, schema=None, scope=None):
         scope = scope or self.scope
@@ -76,13 +216,17 @@ class Database(Loggable, WithApply, WithScope):
         if schema is None:
             schema = self.backend.default_schema
 
-        key = (scope, schema, table_name)
+        key = (self.get_scope_key(scope), schema, table_name)
         return await self.cache_by_async(
             'models',
             key,
             lambda: self._get_model(table_name, schema, scope=scope)
         )
 
+    def get_scope_key(self, scope):
+        # avoid freezing the default scope on every hot lookup
+        return None if scope is self.scope else scope
+
     async def _get_model(self, table_name, schema=None, scope=None):
         table = await self.get_table(table_name, schema=schema, scope=scope)
         return TableModel(database=self, table=table)
@@ -96,7 +240,7 @@ class Database(Loggable, WithApply, WithScope):
         if schema is None:
             schema = self.backend.default_schema
 
-        key = (scope, schema, table_name)
+        key = (self.get_scope_key(scope), schema, table_name)
         return await self.cache_by_async(
             'tables',
             key,
@@ -128,95 +272,370 @@ class Database(Loggable, WithApply, WithScope):
     async def full_version(self):
         return await self.get_full_version()
 
-    async def stream(self, query, params=None, transaction=True, connection=None):
+    async def stream(
+        self,
+        query,
+        params=None,
+        transaction=True,
+        connection=None,
+        prefetch=None,
+        fetch_format='records'
+    ):
+        """Yield result rows from a server-side cursor
+
+        Arguments:
+            prefetch: number of rows to fetch at a time
+            fetch_format: "records" to yield rows,
+                or "columns" to yield chunks of up to prefetch rows
+                as dicts of column name -> column values
+        """
+        if fetch_format == 'columns':
+            prefetch = prefetch or STREAM_CHUNK_SIZE
+        reads = None
         if isinstance(query, (dict, list)):
+            if self.replicas:
+                reads = get_tables(query)[0]
             # build zql
-            queries = build(query, dialect=self.backend.dialect)
+            queries = build(query, dialect=self.backend.dialect, cache=True)
         else:
             queries = [(query, params)]
 
+        database = await self.get_replica(queries, connection, reads) or self
+        async for row in database._stream(
+            queries, connection, transaction, prefetch, fetch_format
+        ):
+            yield row
+
+    async def _stream(self, queries, connection, transaction, prefetch, fetch_format):
+        columns = fetch_format == 'columns'
         pool = await self.pool
-        connection = connection or self._connection
-        connection = aecho(connection) if connection else pool.acquire()
+        connection = self.acquire(pool, connection or self._connection)
 
-        async with connection as conn:
-            transaction = conn.transaction() if transaction else aecho()
+        async with connection as conn, self.statement(conn):
+            transaction = self.backend.transaction(conn) if transaction else aecho()
             async with transaction:
                 for query, params in queries:
-                    pquery = print_query(query, params)
-                    if self.prompt:
-                        if not confirm(f"{self.name} ({self.tag}): {SEP}{pquery}{SEPN}", True):
-                            raise Exception(f"{self}: stream aborted")
-                    else:
-                        # self.log(f"{self}: stream{SEP}{pquery}{SEPN}")
-                        async for row in self.backend.cursor(conn, query, params):
+                    query_id = self.before_query('stream', query, params)
+                    start = time.perf_counter()
+                    rows = 0
+                    chunk = []
+                    async for row in self.backend.cursor(
+                        conn, query, params, prefetch=prefetch
+                    ):
+                        rows += 1
+                        if not columns:
                             yield row
+                            continue
+                        chunk.append(row)
+                        if len(chunk) == prefetch:
+                            yield to_columns(chunk)
+                            chunk = []
+                    if chunk:
+                        yield to_columns(chunk)
+                    self.after_query('stream', query_id, start, rows)
+
+    def acquire(self, pool, connection=None, write=False):
+        """Get a connection context
+
+        Explicit connections are used as-is; otherwise a pool connection
+        is acquired within the database concurrency limit
+
+        Arguments:
+            write: if True, the connection will be used for writes,
+                for backends with a dedicated writer connection
+        """
+        if connection:
+            return aecho(connection)
+        if write and self.backend.has('writer'):
+            # fail before waiting for a slot that may never be released
+            pool.check_writer()
+            context = pool.acquire(write=True)
+        else:
+            context = pool.acquire()
+        # tasks holding a host slot, and the tasks they start, share it:
+        # e.g. the source read of a shard copied in a target transaction
+        return LimitedContext(
+            self.limiter,
+            LimitedContext(self.host_limiter, context, reentrant=True)
+        )
+
+    @cached_property
+    def host_limiter(self):
+        """Connection budget shared with other databases on this host
+
+        Sized for the largest of their pools, see PoolRegistry.get_limiter.
+        A task holds at most one slot, shared with the tasks it starts,
+        see acquire
+        """
+        return pools.get_limiter(self.host.name, self.max_pool_size)
+
+    def is_write(self, query):
+        # ZQL other than select; SQL writes are expected to use execute
+        if isinstance(query, list):
+            return any(self.is_write(q) for q in query)
+        if isinstance(query, dict):
+            return next(iter(query), None) != 'select'
+        return False
+
+    def get_pool_stats(self):
+        """Connection pool stats, if the pool keeps any"""
+        get_stats = getattr(self._pool, 'get_stats', None)
+        return get_stats() if get_stats else None
+
+    def before_query(self, action, query, params):
+        """Prompt for and log a query about to run
+
+        The query is only rendered if it is going to be shown
+
+        Returns:
+            query ID
+        """
+        query_id = next(QUERY_IDS)
+        if self.prompt:
+            pquery = print_query(query, params)
+            if not confirm(f"{self.name} ({self.tag}): {SEP}{pquery}{SEPN}", True):
+                raise Exception(f"{self}: {action} aborted")
+        elif self.is_logging():
+            pquery = print_query(query, params)
+            self.log(
+                f"{self}: {action} #{query_id}{SEP}{pquery}{SEPN}",
+                extra={
+                    'database': self.name,
+                    'action': action,
+                    'query_id': query_id
+                }
+            )
+        return query_id
+
+    def after_query(self, action, query_id, start, rows):
+        if not self.is_logging():
+            return
+        duration = time.perf_counter() - start
+        # rows: None if unknown, e.g. for DDL
+        done = f"{duration:.3f}s" if rows is None else f"{rows} rows, {duration:.3f}s"
+        self.log(
+            f"{self}: {action} #{query_id} done ({done})",
+            extra={
+                'database': self.name,
+                'action': action,
+                'query_id': query_id,
+                'duration': duration,
+                'rows': rows
+            }
+        )
 
     def use(self, connection):
         self._connection = connection
 
+    @asynccontextmanager
+    async def transaction(self, connection=None):
+        """Acquire a connection and run a transaction on it
+
+        Pass the yielded connection to queries that should be part
+        of the transaction
+        """
+        pool = await self.pool
+        connection = self.acquire(pool, connection or self._connection, write=True)
+        async with connection as conn:
+            async with self.backend.transaction(conn):
+                yield conn
+
+    @asynccontextmanager
+    async def bulk_load(self, connection=None, pragmas=None):
+        """Acquire a write connection with unsafe but fast settings
+
+        The settings are restored on exit; e.g. for SQLite,
+        synchronous writes are turned off. Start transactions
+        on the yielded connection, not around this context
+        """
+        pool = await self.pool
+        connection = self.acquire(pool, connection or self._connection, write=True)
+        async with connection as conn:
+            async with self.backend.bulk_load(conn, pragmas=pragmas):
+                yield conn
+
+    @asynccontextmanager
+    async def batch(self):
+        """Defer ZQL executed in this task, then run it in one transaction
+
+        Statements are run on exit, BATCH_SIZE per call on backends
+        that accept multiple statements; e.g. for schema merges,
+        see WithMerge.merge_table. Nested batches join the outer batch
+        of the same database
+        """
+        batch = statement_batch.get()
+        if batch is not None and batch[0] is self:
+            yield
+            return
+
+        queries = []
+        token = statement_batch.set((self, queries))
+        try:
+            yield
+        finally:
+            statement_batch.reset(token)
+        if queries:
+            await self.execute_batch(queries)
+
+    async def execute_batch(self, queries, connection=None):
+        """Execute a list of ZQL statements in one transaction"""
+        dialect = self.backend.dialect
+        statements = []
+        for i in range(0, len(queries), BATCH_SIZE):
+            chunk = queries[i:i + BATCH_SIZE]
+            if self.backend.has('multiple_statements'):
+                query, params = build(chunk, dialect=dialect, combine=True)
+                if not params:
+                    statements.append((query, params))
+                    continue
+            # parameterized SQL must be sent one statement at a time
+            statements.extend(build(chunk, dialect=dialect))
+
+        writes = get_tables(queries)[1] if self.tracks_tables else None
+        try:
+            async with self.transaction(connection) as conn:
+                for query, params in statements:
+                    await self._execute(query, params, conn, False)
+        finally:
+            self.wrote(writes)
+
     async def execute(self, query, params=None, connection=None, transaction=False):
+        batch = statement_batch.get()
+        if (
+            batch is not None and batch[0] is self
+            and connection is None and isinstance(query, (dict, list))
+        ):
+            # deferred until the end of the batch
+            batch[1].extend(query if isinstance(query, list) else [query])
+            return None
+
+        writes = None
         if isinstance(query, (dict, list)):
+            if self.tracks_tables:
+                writes = get_tables(query)[1]
             # build zql query
-            query, params = build(query, dialect=self.backend.dialect, combine=True)
-
+            query, params = build(
+                query, dialect=self.backend.dialect, combine=True, cache=True
+            )
+        try:
+            return await self._execute(query, params, connection, transaction)
+        finally:
+            # None for SQL, which may write to any table
+            self.wrote(writes)
+
+    async def _execute(self, query, params, connection, transaction):
         pool = await self.pool
-        connection = connection or self._connection
-        connection = aecho(connection) if connection else pool.acquire()
-        pquery = print_query(query, params)
+        connection = self.acquire(pool, connection or self._connection, write=True)
 
-        async with connection as conn:
-            if self.prompt:
-                if not confirm(f"{self.name} ({self.tag}): {SEP}{pquery}{SEPN}", True):
-                    raise Exception(f"{self}: execute aborted")
-            else:
-                self.log(f"{self}: execute{SEP}{pquery}{SEPN}")
-            transaction = conn.transaction() if transaction else aecho()
+        async with connection as conn, self.statement(conn):
+            query_id = self.before_query('execute', query, params)
+            start = time.perf_counter()
+            transaction = self.backend.transaction(conn) if transaction else aecho()
             async with transaction:
                 try:
-                    return await self.backend.execute(
+                    result = await self.backend.execute(
                         conn, query, params
                     )
                 except Exception as e:
                     err = f"{self}: execute failed; {e.__class__.__name__}: {e}"
-                    err += f"\nQuery:{SEP}{pquery}{SEPN}"
-                    raise Exception(err)
+                    err += f"\nQuery:{SEP}{print_query(query, params)}{SEPN}"
+                    raise Exception(err) from e
+            self.after_query(
+                'execute', query_id, start, self.backend.get_row_count(result)
+            )
+            return result
 
     async def query(
-        self, query, params=None, connection=None, many=True, columns=True, transaction=False
+        self,
+        query,
+        params=None,
+        connection=None,
+        many=True,
+        columns=True,
+        transaction=False,
+        fetch_format='records'
     ):
-        pool = await self.pool
-        connection = connection or self._connection
-        connection = aecho(connection) if connection else pool.acquire()
-
+        """Run one or more queries and fetch all results
+
+        Arguments:
+            fetch_format: "records" for lists of rows,
+                or "columns" for dicts of column name -> column values,
+                see adbc.columns
+        """
+        reads = writes = None
+        write = self.is_write(query)
         if isinstance(query, (dict, list)):
+            if self.tracks_tables:
+                reads, writes = get_tables(query)
             # build zql
-            queries = build(query, dialect=self.backend.dialect)
+            queries = build(query, dialect=self.backend.dialect, cache=True)
         else:
+            # SQL writes are expected to use execute, see is_write
             queries = [(query, params)]
 
+        options = (write, many, columns, fetch_format)
+        cached = (
+            self.results is not None and reads and not writes
+            and not connection and not transaction
+        )
+        if cached:
+            key = freeze((queries, options))
+            result = self.results.get(key)
+            if result is not MISSING:
+                return result
+            versions = self.results.get_versions(reads)
+
+        if not write:
+            replica = await self.get_replica(queries, connection, reads)
+            if replica:
+                # may be behind the primary: not cached
+                return await replica._query(queries, None, transaction, *options)
+
+        try:
+            result = await self._query(queries, connection, transaction, *options)
+        finally:
+            if writes:
+                self.wrote(writes)
+        if cached:
+            return self.results.set(key, result, reads, versions)
+        return result
+
+    async def _query(
+        self, queries, connection, transaction, write, many, columns, fetch_format
+    ):
+        pool = await self.pool
+        connection = self.acquire(pool, connection or self._connection, write=write)
+
         one = len(queries) == 1
         all_results = []
-        async with connection as conn:
-            transaction = conn.transaction() if transaction else aecho()
+        async with connection as conn, self.statement(conn):
+            transaction = self.backend.transaction(conn) if transaction else aecho()
             async with transaction:
                 for query, params in queries:
-                    pquery = print_query(query, params)
-                    if self.prompt:
-                        if not confirm(f"{self.name} ({self.tag}): {SEP}{pquery}{SEPN}", True):
-                            raise Exception(f"{self}: query aborted")
-                    else:
-                        self.log(f"{self}: query{SEP}{pquery}{SEPN}")
+                    query_id = self.before_query('query', query, params)
+                    start = time.perf_counter()
+                    names = None
                     try:
-                        results = await self.backend.fetch(conn, query, params)
+                        if many and fetch_format == 'columns':
+                            # names of columns without values, for empty results
+                            results, names = await self.backend.fetch_columns(
+                                conn, query, params
+                            )
+                        else:
+                            results = await self.backend.fetch(conn, query, params)
                     except Exception as e:
                         err = f"{self}: query failed; {e.__class__.__name__}: {e}"
-                        err += f"\nQuery:{SEP}{pquery}{SEPN}"
-                        raise Exception(err)
+                        err += f"\nQuery:{SEP}{print_query(query, params)}{SEPN}"
+                        raise Exception(err) from e
+                    self.after_query('query', query_id, start, len(results))
                     if many:
-                        all_results.append(
-                            results if columns else [r[0] for r in results]
-                        )
+                        if fetch_format == 'columns':
+                            results = to_columns(results, names)
+                            if not columns:
+                                results = next(iter(results.values()), [])
+                        elif not columns:
+                            results = [r[0] for r in results]
+                        all_results.append(results)
                         continue
                     else:
                         num = len(results)
@@ -240,9 +659,18 @@ class Database(Loggable, WithApply, WithScope):
     async def query_one_column(self, query, params=None, **kwargs):
         return await self.query(query, params=params, many=True, columns=False, **kwargs)
 
+    async def query_columns(self, query, params=None, **kwargs):
+        return await self.query(query, params=params, fetch_format='columns', **kwargs)
+
     async def query_one_value(self, query, params=None, **kwargs):
         return await self.query(query, params=params, many=False, columns=False, **kwargs)
 
+    def get_statement_stats(self):
+        return self.backend.get_statement_stats()
+
+    def get_result_cache_stats(self):
+        return self.results.get_stats() if self.results is not None else None
+
     async def get_full_version(self):
         version = await self.query_one_value(self.backend.get_query('version'))
         return version
@@ -282,15 +710,122 @@ class Database(Loggable, WithApply, WithScope):
         return self.host._backend
 
     async def get_pool(self):
+        kwargs = {}
+        if self.pragmas is not None:
+            kwargs['pragmas'] = self.pragmas
         return await self.backend.create_pool(
             self.host.url,
             max_size=self.max_pool_size,
             min_size=self.min_pool_size,
-            skip_ca_check=SKIP_CA_CHECK
+            max_idle=self.pool_max_idle,
+            statement_timeout=self.timeout,
+            skip_ca_check=SKIP_CA_CHECK,
+            **kwargs
+        )
+
+    def get_pool_key(self):
+        return pools.get_key(
+            self.host.url,
+            max_size=self.max_pool_size,
+            min_size=self.min_pool_size,
+            max_idle=self.pool_max_idle,
+            statement_timeout=self.timeout,
+            pragmas=self.pragmas
+        )
+
+    def warm_up(self, size=None):
+        """Open pool connections in the background
+
+        Call before fanning out queries, e.g. in copy or info steps,
+        so that they do not wait on connection setup
+
+        Arguments:
+            size: connections to open, by default the concurrency
+        """
+        if self._warming is None or self._warming.done():
+            self._warming = asyncio.ensure_future(self._warm_up(size))
+        return self._warming
+
+    async def _warm_up(self, size):
+        try:
+            pool = await self.pool
+            await self.backend.warm_up_pool(pool, size or self.concurrency)
+        except Exception as e:
+            # queries will open connections as needed
+            self.log(f'{self}: pool warm up failed: {e}')
+
+    def get_timeout(self):
+        """Statement timeout for the current task, if any
+
+        Set for a task (e.g. a workflow step) with the
+        statement_timeout context variable, or for the database
+        """
+        timeout = statement_timeout.get()
+        return self.timeout if timeout is None else timeout
+
+    def statement(self, connection):
+        """Apply the statement timeout while using a connection"""
+        return self.backend.statement(
+            connection, timeout=self.get_timeout(), default=self.timeout
+        )
+
+    @property
+    def retry_policies(self):
+        if self._retry_policies is None:
+            return self.backend.retry_policies
+        return self._retry_policies
+
+    async def retry(self, operation, *args, **kwargs):
+        """Await an idempotent operation, retrying transient errors
+
+        Only for operations that do not run in an outer transaction:
+        a failed statement aborts the transaction
+
+        Arguments:
+            operation: coroutine function, e.g. self.query
+        """
+        return await retry(
+            operation,
+            *args,
+            policies=self.retry_policies,
+            on_retry=self.on_retry,
+            **kwargs
+        )
+
+    def on_retry(self, error, attempt, delay):
+        self.retries[type(error).__name__] += 1
+        self.log(
+            f'{self}: retry #{attempt} in {delay:.2f}s after {error!r}'
         )
 
+    def get_retry_stats(self):
+        """Number of retries by error class name"""
+        return dict(self.retries)
+
+    async def check_pool(self):
+        """Ping idle pool connections, evicting broken and stale ones"""
+        if not self._pool:
+            return None
+        return await self.backend.check_pool(
+            self._pool, limiters=(self.limiter, self.host_limiter)
+        )
+
+    async def _check_pool_periodically(self):
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                result = await self.check_pool()
+            except Exception as e:
+                self.log(f'{self}: pool health check failed: {e}')
+            else:
+                if result and result['evicted']:
+                    self.log(f'{self}: pool health check: {result}')
+
     async def get_connection(self):
-        return await self.backend.connect(self.host.url)
+        kwargs = {}
+        if self.timeout is not None and self.backend.has('statement_timeout'):
+            kwargs['statement_timeout'] = self.timeout
+        return await self.backend.connect(self.host.url, **kwargs)
 
     async def get_children(self, scope=None):
         scope = scope or self.scope
@@ -302,7 +837,7 @@ class Database(Loggable, WithApply, WithScope):
 
     async def get_namespaces(self, scope=None):
         query = self.get_namespaces_query(scope=scope)
-        rows = await self.query(query)
+        rows = await self.retry(self.query, query)
         result = []
         for row in rows:
             try:
@@ -316,5 +851,16 @@ class Database(Loggable, WithApply, WithScope):
     @property
     async def pool(self):
         if not getattr(self, '_pool', None):
-            self._pool = await self.get_pool()
+            key = self.get_pool_key()
+            pool = await pools.acquire(key, self.get_pool)
+            if self._pool:
+                # acquired concurrently
+                await pools.release(key)
+            else:
+                self._pool = pool
+                self._pool_key = key
+                if self.health_check_interval:
+                    self._checking = asyncio.ensure_future(
+                        self._check_pool_periodically()
+                    )
         return self._pool
@@ -50,7 +50,8 @@ class Host(Loggable, WithScope):
         )
 
     async def get_databases(self, scope=None):
-        databases = await self.database.query_one_column(
+        databases = await self.database.retry(
+            self.database.query_one_column,
             *self._backend.get_query('databases')
         )
         return [
@@ -0,0 +1,116 @@
+import os
+import json
+import asyncio
+
+from adbc.utils import FairSemaphore
+
+
+# connections in flight per host, across all databases
+# by default, the largest max pool size of the databases on the host
+HOST_CONNECTIONS = int(os.environ.get('ADBC_HOST_CONNECTIONS', 0)) or None
+
+
+class PoolRegistry(object):
+    """Process-wide registry of shared connection pools
+
+    Databases with the same URL and pool options share one pool,
+    which is closed when the last of them releases it.
+    Databases on the same host also share a connection budget
+    """
+
+    def __init__(self, host_connections=HOST_CONNECTIONS):
+        self.host_connections = host_connections
+        # key -> [pool, references, event loop]
+        self.pools = {}
+        self.creating = {}
+        self.limiters = {}
+
+    @staticmethod
+    def get_key(url, **options):
+        return (url, json.dumps(options, sort_keys=True, default=str))
+
+    async def acquire(self, key, create):
+        """Get the pool for a key and add a reference to it
+
+        Arguments:
+            create: coroutine function creating the pool,
+                called once for concurrent acquires of a new key
+        """
+        loop = asyncio.get_running_loop()
+        entry = self.pools.get(key)
+        if entry is not None and entry[2] is not loop:
+            # left open by a previous event loop
+            del self.pools[key]
+            await self.close_stale(entry[0])
+            entry = None
+
+        if entry is None:
+            creating = self.creating.get(key)
+            if creating is None:
+                creating = self.creating[key] = loop.create_task(create())
+                try:
+                    pool = await creating
+                finally:
+                    del self.creating[key]
+                entry = self.pools[key] = [pool, 0, loop]
+            else:
+                await asyncio.shield(creating)
+                entry = self.pools[key]
+
+        entry[1] += 1
+        return entry[0]
+
+    @staticmethod
+    async def close_stale(pool):
+        """Close a pool left open by a previous event loop"""
+        terminate = getattr(pool, 'terminate', None)
+        try:
+            if terminate is not None:
+                # asyncpg: cannot be awaited outside of its event loop
+                terminate()
+            else:
+                await pool.close()
+        except Exception:
+            # connections already closed with their event loop
+            pass
+
+    async def release(self, key):
+        """Remove a reference to a pool, closing it after the last one"""
+        entry = self.pools.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self.pools[key]
+            await entry[0].close()
+
+    def get_limiter(self, host, size):
+        """Get the connection budget shared by databases on a host
+
+        Without host_connections, the budget grows to the largest size
+        asked for, so that no database is limited below its own pool size
+        """
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            limiter = self.limiters[host] = FairSemaphore(
+                self.host_connections or size
+            )
+        elif not self.host_connections and size > limiter.value:
+            limiter.grow(size)
+        return limiter
+
+    def get_stats(self):
+        return {
+            'pools': len(self.pools),
+            'references': sum(entry[1] for entry in self.pools.values()),
+            'hosts': {
+                host: {
+                    'size': limiter.value,
+                    'waiting': limiter.waiting
+                }
+                for host, limiter in self.limiters.items()
+            }
+        }
+
+
+pools = PoolRegistry()
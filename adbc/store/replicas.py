@@ -0,0 +1,123 @@
+import math
+import time
+import asyncio
+from adbc.zql.utils import ALL_TABLES
+
+
+class ReplicaSet(object):
+    """Read replicas of a database
+
+    Reads are routed to a replica picked round-robin
+    or least-busy (fewest queries in flight or waiting).
+
+    With max_lag, replicas further behind the primary than max_lag
+    seconds (or unreachable) are skipped, see get_lag.
+    When no replica is left, reads fall back to the primary
+    or fail, depending on fallback
+
+    Reads of tables written through the primary stay on the primary
+    for read_after_write seconds, so that they see the writes,
+    see is_written
+    """
+    STRATEGIES = ('round_robin', 'least_busy')
+
+    def __init__(
+        self,
+        replicas,
+        strategy='round_robin',
+        max_lag=None,
+        fallback=True,
+        lag_interval=5,
+        read_after_write=60
+    ):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(
+                f'replica strategy must be one of {self.STRATEGIES}'
+            )
+        self.replicas = replicas
+        self.strategy = strategy
+        self.max_lag = max_lag
+        self.fallback = fallback
+        # seconds before a replica's lag is checked again
+        self.lag_interval = lag_interval
+        self.read_after_write = read_after_write
+        # table name or ALL_TABLES -> time of its last write
+        self.writes = {}
+        # replica index -> (lag, check time)
+        self.lags = {}
+        self.next = 0
+
+    async def get(self):
+        """Get a replica Database to read from
+
+        Returns:
+            replica, or None to read from the primary
+        """
+        replicas = self.replicas
+        if self.max_lag is not None:
+            lags = await asyncio.gather(
+                *[self.get_lag(i) for i in range(len(replicas))]
+            )
+            replicas = [
+                replica for replica, lag in zip(replicas, lags)
+                if lag <= self.max_lag
+            ]
+            if not replicas:
+                if self.fallback:
+                    return None
+                raise Exception(
+                    f'no replica within {self.max_lag} seconds of the primary'
+                )
+
+        if self.strategy == 'least_busy':
+            return min(replicas, key=lambda replica: replica.limiter.busy)
+        replica = replicas[self.next % len(replicas)]
+        self.next += 1
+        return replica
+
+    def wrote(self, tables=None):
+        """Record writes to tables, or to any table if None"""
+        now = time.monotonic()
+        for table in tables or (ALL_TABLES,):
+            self.writes[table] = now
+
+    def is_written(self, tables=None):
+        """Whether tables were written within read_after_write seconds
+
+        Arguments:
+            tables: names of the tables read, or None if unknown
+        """
+        since = time.monotonic() - self.read_after_write
+        # unknown tables may be any written table
+        tables = self.writes if tables is None else [ALL_TABLES, *tables]
+        return any(
+            self.writes.get(table, -math.inf) > since for table in tables
+        )
+
+    async def get_lag(self, index):
+        """Replication lag of a replica in seconds, checked at intervals
+
+        Unreachable replicas lag infinitely,
+        and replicas of backends without a lag query never lag
+        """
+        now = time.monotonic()
+        lag, checked = self.lags.get(index, (None, None))
+        if checked is not None and now - checked < self.lag_interval:
+            return lag
+
+        replica = self.replicas[index]
+        query = replica.backend.get_replica_lag_query()
+        if query is None:
+            lag = 0
+        else:
+            try:
+                lag = await replica.query_one_value(query) or 0
+            except Exception as e:
+                replica.log(f'{replica}: replica lag check failed: {e}')
+                lag = math.inf
+        self.lags[index] = (lag, now)
+        return lag
+
+    async def close(self):
+        for replica in self.replicas:
+            await replica.close()
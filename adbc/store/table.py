@@ -4,13 +4,14 @@ import re
 from typing import Union
 from copy import copy
 from collections import defaultdict
+from collections.abc import MutableMapping
 from adbc.exceptions import NotIncluded
 from adbc.logging import Loggable
 from adbc.scope import WithScope
 from adbc.generators import G
 from adbc.constants import SEQUENCE, TABLE, PRIMARY, UNIQUE, FOREIGN
 from cached_property import cached_property
-from adbc.utils import get_first
+from adbc.utils import get_first, fair_group
 
 
 
@@ -55,6 +56,98 @@ def get_uniques(constraints):
     return uniques
 
 
+MISSING = object()
+
+
+class Column(MutableMapping):
+    """Compact column definition
+
+    Behaves like the column dict it replaces, but stores the known
+    column fields in slots; any other keys go into a lazily-created dict
+    """
+    FIELDS = (
+        'type',
+        'default',
+        'null',
+        'sequence',
+        'primary',
+        'unique',
+        'related',
+        'choices',
+        'alias',
+    )
+    __slots__ = FIELDS + ('_extra', )
+    _FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self, data=None):
+        data = data or {}
+        found = 0
+        for field in self.FIELDS:
+            value = data.get(field, MISSING)
+            if value is not MISSING:
+                found += 1
+            setattr(self, field, value)
+        self._extra = None
+        if found < len(data):
+            self._extra = {
+                key: value for key, value in data.items()
+                if key not in self._FIELD_SET
+            }
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            value = getattr(self, key)
+            if value is not MISSING:
+                return value
+        elif self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self._FIELD_SET:
+            value = getattr(self, key)
+            return default if value is MISSING else value
+        if self._extra:
+            return self._extra.get(key, default)
+        return default
+
+    def __contains__(self, key):
+        if key in self._FIELD_SET:
+            return getattr(self, key) is not MISSING
+        return bool(self._extra) and key in self._extra
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELD_SET:
+            if getattr(self, key) is MISSING:
+                raise KeyError(key)
+            setattr(self, key, MISSING)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if getattr(self, field) is not MISSING:
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 class Table(WithScope, Loggable):
     type = "table"
 
@@ -94,25 +187,68 @@ class Table(WithScope, Loggable):
             "immutable", not (bool(self.on_update) or bool(self.on_delete))
         )
         self.sequences_enabled = self.scope.get('sequences', True)
-        self.columns = self.get_children("columns", columns)
-        self.column_names = list(self.columns.keys())
-        constraint_types = self.scope.get('constraint_types', None)
-        self.constraints = self.get_children(
+        self._columns = {
+            name: Column(column) for name, column in
+            self.get_children("columns", columns).items()
+        }
+        self._constraints = self.get_children(
             "constraints",
             constraints or [],
             type=self.scope.get('constraint_types', None)
         )
         self.indexes = self.get_children("indexes", indexes or [])
+        # defaults, keys and constraints are derived on first access
+        self._initialized = False
 
+    def initialize(self):
+        if self._initialized:
+            return
+        self._initialized = True
         if self.type == SEQUENCE:
             # sequences do not have constraints/indexes
             self.init_sequence()
         else:
             self.init_table()
 
-    def init_sequence(self):
-        pass
+    @property
+    def columns(self):
+        self.initialize()
+        return self._columns
+
+    @property
+    def column_names(self):
+        return list(self._columns.keys())
 
+    @property
+    def constraints(self):
+        self.initialize()
+        return self._constraints
+
+    @property
+    def pks(self):
+        self.initialize()
+        return self._pks
+
+    @property
+    def pk(self):
+        self.initialize()
+        return self._pk
+
+    @property
+    def uniques(self):
+        self.initialize()
+        return self._uniques
+
+    @property
+    def fks(self):
+        self.initialize()
+        return self._fks
+
+    def init_sequence(self):
+        self._pks = {}
+        self._uniques = {}
+        self._fks = {}
+        self._pk = None
 
     @property
     def database(self):
@@ -129,11 +265,11 @@ class Table(WithScope, Loggable):
         # - primary: based on primary constraint or index
         # - unique: based on unique constraints
         # - related: based on foreign key constraints
-        constraints = self.constraints
-        self.pks = get_pks(constraints) or {}
-        uniques = self.uniques = get_uniques(constraints)
-        fks = self.fks = get_fks(constraints)
-        for name, column in self.columns.items():
+        constraints = self._constraints
+        pks = self._pks = get_pks(constraints) or {}
+        uniques = self._uniques = get_uniques(constraints)
+        fks = self._fks = get_fks(constraints)
+        for name, column in self._columns.items():
             if "default" in column:
                 default = column['default'] = self.backend.parse_expression(
                     column['default']
@@ -150,20 +286,20 @@ class Table(WithScope, Loggable):
                     column["sequence"] = column.get("sequence", False) if self.sequences_enabled else False
 
             if column.get("primary"):
-                if name not in self.pks:
+                if name not in pks:
                     primary = column.get("primary")
                     constraint_name = (
                         primary
                         if isinstance(primary, str)
                         else f"{self.name}__{name}__pk"
                     )
-                    self.pks[name] = constraint_name
+                    pks[name] = constraint_name
                     constraints[constraint_name] = G('constraint',
                         type=PRIMARY,
                         columns=[name]
                     )
             else:
-                column["primary"] = self.pks.get(name, False)
+                column["primary"] = pks.get(name, False)
 
             if not column.get('choices'):
                 # TODO: support getting choices from passed-in scope
@@ -209,14 +345,14 @@ class Table(WithScope, Loggable):
                     }
             else:
                 column['related'] = fks.get(name, None)
-        if not self.pks:
-            self.pks = {
+        if not pks:
+            pks = self._pks = {
                 name: True for name in self.column_names
             }
-        if len(self.pks) == 1:
-            self.pk = next(iter(self.pks))
+        if len(pks) == 1:
+            self._pk = next(iter(pks))
         else:
-            self.pk = None
+            self._pk = None
 
     def __str__(self):
         return f"{self.namespace}.{self.name}"
@@ -264,35 +400,13 @@ class Table(WithScope, Loggable):
     async def get_info(self, schema=True, data=True, hashes=False, **kwargs):
         result = {}
         exclude = kwargs.get("exclude", None)
-        if data:
-            if self.type == 'table':
-                data_range = self.get_range()
-                count = self.get_count()
-                jobs = [data_range, count]
-                data_hashes = None
-                if hashes:
-                    shard_size = (
-                        hashes if hashes is not True and isinstance(hashes, int)
-                        else None
-                    )
-                    data_hashes = self.get_hashes(shard_size=shard_size)
-                    jobs.append(data_hashes)
-
-                results = await asyncio.gather(*jobs)
-                if hashes:
-                    data_range, count, data_hashes = results
-                else:
-                    data_range, count = results
-
-                result["rows"] = {
-                    "count": count,
-                    "range": data_range,
-                }
-                if hashes:
-                    result["rows"]["hashes"] = data_hashes
-            else: # sequence
-                value = await self.get_sequence_last_value()
-                result['value'] = value
+        # queue this table's queries together for fair scheduling
+        group = fair_group.set(str(self))
+        try:
+            if data:
+                result.update(await self.get_data_info(hashes=hashes))
+        finally:
+            fair_group.reset(group)
 
         schema = self.get_schema(exclude=exclude)
         result.update(schema)
@@ -302,6 +416,38 @@ class Table(WithScope, Loggable):
         self.log(f"{self}: info")
         return result
 
+    async def get_data_info(self, hashes=False):
+        result = {}
+        if self.type == 'table':
+            data_range = self.get_range()
+            count = self.get_count()
+            jobs = [data_range, count]
+            data_hashes = None
+            if hashes:
+                shard_size = (
+                    hashes if hashes is not True and isinstance(hashes, int)
+                    else None
+                )
+                data_hashes = self.get_hashes(shard_size=shard_size)
+                jobs.append(data_hashes)
+
+            results = await asyncio.gather(*jobs)
+            if hashes:
+                data_range, count, data_hashes = results
+            else:
+                data_range, count = results
+
+            result["rows"] = {
+                "count": count,
+                "range": data_range,
+            }
+            if hashes:
+                result["rows"]["hashes"] = data_hashes
+        else: # sequence
+            value = await self.get_sequence_last_value()
+            result['value'] = value
+        return result
+
     def realias(self, result: dict):
         new_result = {}
         for key, value in result.items():
@@ -323,9 +469,12 @@ class Table(WithScope, Loggable):
         """
         if self.type == 'table':
             exclude = exclude or {}
+            columns = {
+                name: dict(column) for name, column in self.columns.items()
+            }
             result = {
                 "columns": self.realias(
-                    self.exclude(self.columns, exclude.get("columns"))
+                    self.exclude(columns, exclude.get("columns"))
                 )
             }
             if self.constraints is not None:
@@ -465,8 +614,10 @@ class Table(WithScope, Loggable):
                 count=count,
                 md5=md5,
             )
-            result = await self.database.query_one_row(query)
-            return result
+            # read-only, safe to retry
+            return await self.database.retry(
+                self.database.query_one_row, query
+            )
 
     def order_by_alias(self, columns):
         return sorted(
@@ -498,8 +649,8 @@ class Table(WithScope, Loggable):
         # hashes across datastores with different schematic names
         columns = self.order_by_alias(columns)
         # concatenate values together 
-        aggregate = [f"T.{c}" for c in columns]
-        aggregate = {'json_build_array': aggregate}
+        values = [f"T.{c}" for c in columns]
+        aggregate = {'json_build_array': values}
 
         output = []
         pk = pks[0]
@@ -514,6 +665,9 @@ class Table(WithScope, Loggable):
                         ]
                     }
                 }
+            elif self.backend.has_function('md5_agg'):
+                # same digest, hashed incrementally
+                md5 = {'md5_agg': values}
             else:
                 md5 = {
                     'md5': {
@@ -533,9 +687,13 @@ class Table(WithScope, Loggable):
         if min_pk:
             output.append({'min': min_pk})
 
+        # bind cursor and limit as parameters so that every shard
+        # runs the same statement
         where = None
-        if cursor:
-            where = {'>': [pk, cursor]}
+        if cursor is not None:
+            where = {'>': [pk, {'literal': cursor}]}
+        if limit is not None:
+            limit = {'literal': limit}
 
         query = {
             'select': {
@@ -574,8 +732,10 @@ class Table(WithScope, Loggable):
             }
 
         where = None
-        if cursor:
-            where = {'>': [field, cursor]}
+        if cursor is not None:
+            where = {'>': [field, {'literal': cursor}]}
+        if limit is not None:
+            limit = {'literal': limit}
         query = {
             'select': {
                 'data': f'T.{field}',
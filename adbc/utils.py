@@ -2,6 +2,7 @@ import re
 import inspect
 import asyncio
 import collections
+from contextvars import ContextVar
 from urllib.parse import urlparse
 from copy import deepcopy
 from cached_property import cached_property  # noqa
@@ -121,6 +122,23 @@ def merge(dictionary, other):
     return dictionary
 
 
+def merged(dictionary, other):
+    """Like merge, but returns a new dictionary
+
+    Neither argument is modified; unchanged values are shared
+    """
+    result = dict(dictionary)
+    for k, v in other.items():
+        if (
+            isinstance(v, collections.abc.Mapping)
+            and isinstance(result.get(k), collections.abc.Mapping)
+        ):
+            result[k] = merged(result[k], v)
+        else:
+            result[k] = v
+    return result
+
+
 def confirm(prompt, default=False):
     if default:
         prompt = f"{prompt} ([y] / n): "
@@ -241,6 +259,143 @@ class AsyncBuffer(object):
             print('read buffer: ', result)
         return result
 
+# scheduling group of the current task, e.g. the table being inspected
+fair_group = ContextVar('fair_group', default=None)
+# statement timeout in seconds for the current task, e.g. a workflow step
+# overrides the database timeout, 0 for no timeout
+statement_timeout = ContextVar('statement_timeout', default=None)
+# (database, ZQL statements) deferred by Database.batch for the current task
+statement_batch = ContextVar('statement_batch', default=None)
+# reentrant LimitedContexts held by the current task or the task that started it
+held_slots = ContextVar('held_slots', default=())
+
+
+class FairSemaphore(object):
+    """Semaphore that hands out free slots round-robin across groups
+
+    Waiters are queued per group (see `fair_group`) and each release
+    wakes the oldest waiter of the next group in turn, so a group with
+    many pending acquires cannot starve the others
+    """
+
+    def __init__(self, value=1):
+        self.value = value
+        self._free = value
+        self._waiters = collections.OrderedDict()
+
+    @property
+    def waiting(self):
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    @property
+    def busy(self):
+        """Slots in use plus waiters"""
+        return self.value - self._free + self.waiting
+
+    def grow(self, value):
+        """Add slots up to value, waking waiters"""
+        for _ in range(value - self.value):
+            self.value += 1
+            self.release()
+
+    async def acquire(self, group=None):
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return True
+
+        if group is None:
+            group = fair_group.get()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(group, collections.deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # slot was handed over as the task got cancelled
+                self.release()
+            else:
+                waiters = self._waiters.get(group)
+                if waiters is not None:
+                    waiters.remove(future)
+                    if not waiters:
+                        del self._waiters[group]
+            raise
+        return True
+
+    def release(self):
+        while self._waiters:
+            group, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                # back of the line
+                self._waiters.move_to_end(group)
+            else:
+                del self._waiters[group]
+            if not future.done():
+                future.set_result(True)
+                return
+        self._free += 1
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *args):
+        self.release()
+
+
+class LimitedContext(object):
+    """Holds a semaphore slot for the lifetime of another async context
+
+    A reentrant context entered by a task that holds a slot of the same
+    semaphore, or by a task started while one was held, shares that slot:
+    e.g. for host budgets, where waiting for a second slot could deadlock
+    """
+
+    def __init__(self, semaphore, context, reentrant=False):
+        self.semaphore = semaphore
+        self.context = context
+        self.reentrant = reentrant
+        self.held = False
+        self.token = None
+
+    def is_held(self):
+        return any(
+            holder.held and holder.semaphore is self.semaphore
+            for holder in held_slots.get()
+        )
+
+    async def __aenter__(self):
+        if self.reentrant and self.is_held():
+            return await self.context.__aenter__()
+
+        await self.semaphore.acquire()
+        try:
+            result = await self.context.__aenter__()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        self.held = True
+        if self.reentrant:
+            self.token = held_slots.set(held_slots.get() + (self,))
+        return result
+
+    async def __aexit__(self, *args):
+        try:
+            return await self.context.__aexit__(*args)
+        finally:
+            if self.held:
+                # no longer shared, even by tasks still running
+                self.held = False
+                self.semaphore.release()
+            if self.token is not None:
+                token, self.token = self.token, None
+                try:
+                    held_slots.reset(token)
+                except ValueError:
+                    # exited in another task, e.g. by a stream consumer
+                    pass
+
+
 def flatten(x):
     return [a for b in x for a in b]
 
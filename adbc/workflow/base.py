@@ -6,7 +6,7 @@ from .copy import CopyStep
 from .info import InfoStep
 from .query import QueryStep
 
-from adbc.utils import is_url
+from adbc.utils import is_url, statement_timeout
 from adbc.store import Database
 
 
@@ -30,6 +30,10 @@ class Workflow(Loggable):
                 url = name
                 scope = None
                 prompt = False
+                concurrency = None
+                pragmas = None
+                timeout = None
+                replicas = None
             else:
                 if name not in self.databases:
                     raise Exception(
@@ -40,10 +44,18 @@ class Workflow(Loggable):
                     prompt = config.get('prompt', False)
                     scope = config.get('scope', None)
                     url = config.get('url')
+                    concurrency = config.get('concurrency', None)
+                    pragmas = config.get('pragmas', None)
+                    timeout = config.get('timeout', None)
+                    replicas = config.get('replicas', None)
                 else:
                     url = config
                     scope = None
                     prompt = False
+                    concurrency = None
+                    pragmas = None
+                    timeout = None
+                    replicas = None
 
             self._databases[key] = Database(
                 name=name,
@@ -51,6 +63,10 @@ class Workflow(Loggable):
                 prompt=prompt,
                 url=url,
                 scope=scope,
+                concurrency=concurrency,
+                pragmas=pragmas,
+                timeout=timeout,
+                replicas=replicas,
                 verbose=self.verbose,
                 logger=self.logger
             )
@@ -63,12 +79,19 @@ class Workflow(Loggable):
 
     async def execute(self):
         results = []
-        # execute all steps
-        for step in self._steps:
-            results.append(await step.execute())
-
-        # close all databases
-        await self.close()
+        try:
+            # execute all steps
+            for step in self._steps:
+                # overrides database timeouts for the step's queries
+                timeout = statement_timeout.set(step.timeout)
+                try:
+                    results.append(await step.execute())
+                finally:
+                    statement_timeout.reset(timeout)
+        finally:
+            # close all databases, also after errors:
+            # open SQLite connections keep their threads alive
+            await self.close()
         return results
 
 
@@ -27,6 +27,10 @@ class CopyStep(Step):
             source.reset()
             target.reset()
 
+        # copies fan out across tables and shards
+        source.warm_up()
+        target.warm_up()
+
         results = await source.copy(
             target,
             scope=scope,
@@ -14,6 +14,9 @@ class InfoStep(Step):
         if self.refresh:
             self.source.reset()
 
+        # info queries fan out across tables
+        self.source.warm_up()
+
         return await self.source.get_info(
             data=self.data,
             schema=self.schema,
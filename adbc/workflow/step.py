@@ -12,6 +12,8 @@ class Step(Loggable):
         self.workflow = workflow
         self.verbose = self.workflow.verbose
         self.config = config
+        # statement timeout in seconds for this step's queries
+        self.timeout = config.get('timeout', None)
         self.validate()
 
     def validate(self):
@@ -1,14 +1,69 @@
 """zql compiler"""
 from typing import List, Dict, Union
-from .dialect import Dialect
+from adbc.cache import CacheBucket, MISSING
+from .dialect import Dialect, ParameterStyle
 from .builders import get_builder
+from .utils import templatize, bind
+
+COMPILE_CACHE_SIZE = 1024
+# compiled (SQL, parameter template) pairs by query template
+compile_cache = CacheBucket(size=COMPILE_CACHE_SIZE)
+CACHEABLE_STYLES = {
+    ParameterStyle.NUMERIC,
+    ParameterStyle.DOLLAR_NUMERIC,
+    ParameterStyle.QUESTION_MARK,
+    ParameterStyle.FORMAT
+}
+CACHEABLE_COMMANDS = {'select', 'insert', 'update', 'delete'}
+
+
+def is_cacheable(query, style):
+    if style not in CACHEABLE_STYLES:
+        return False
+    queries = query if isinstance(query, list) else [query]
+    for query in queries:
+        if not isinstance(query, dict) or len(query) != 1:
+            return False
+        if next(iter(query)) not in CACHEABLE_COMMANDS:
+            return False
+    return True
 
 
 def build(
     query: dict,
     dialect: Dialect,
-    combine: bool = False
+    combine: bool = False,
+    cache: bool = False
 ) -> Union[List[tuple], tuple]:
+    """Build zql into SQL
+
+    Arguments:
+        query: zql query or list of queries
+        dialect: target dialect
+        combine: if True, return one (query, params) pair
+        cache: if True, reuse compiled SQL for queries that only differ
+            in literal values, see utils.templatize
+    """
+    style = dialect.style
+    if cache and is_cacheable(query, style):
+        values = []
+        template = templatize(query, values)
+        # repr keeps key order and types (1 vs 1.0 vs True),
+        # both of which can change the generated SQL
+        key = (dialect.backend, style, combine, repr(template))
+        compiled = compile_cache.get(key)
+        if compiled is MISSING:
+            compiled = compile_cache.set(
+                key, _build(template, dialect, combine)
+            )
+        if combine:
+            return (compiled[0], bind(compiled[1], values))
+        return [(r[0], bind(r[1], values)) for r in compiled]
+
+    return _build(query, dialect, combine)
+
+
+def _build(query, dialect, combine):
     builder = get_builder(dialect)
     style = dialect.style
     result = builder.build(query, style=style)
@@ -159,8 +159,9 @@ class SQLBuilder(Builder):
         if isinstance(query, list):
             results = []
             for q in query:
-                for result in self.build(q, style, depth, params, normalize=False):
-                    results.extend(result)
+                results.extend(
+                    self.build(q, style, depth, params, normalize=False)
+                )
             return results
 
         if style is None:
@@ -352,6 +353,9 @@ class SQLBuilder(Builder):
                 table: identifier
                 values: ?list
                 columns: ?list
+                conflict: ?dict
+                    on: list[identifier]
+                    update: ?union[list[identifier], dict[str, expression]]
                 return: list[identifier]
         """
         indent = self.get_indent(depth)
@@ -361,12 +365,14 @@ class SQLBuilder(Builder):
             table = clause
             with_ = None
             returning = None
+            conflict = None
         else:
             values = clause.get("values")
             columns = clause.get('columns')
             table = clause.get("table")
             with_ = clause.get("with")
             returning = clause.get("return")
+            conflict = clause.get("conflict")
 
         if not table:
             raise ValueError("insert: table is required")
@@ -390,17 +396,52 @@ class SQLBuilder(Builder):
             )
 
         values = self.get_values(values, style, params=params, depth=depth)
+        conflict = self.get_conflict(conflict, style, params, depth=depth)
         # Returning: Postgres-only
         # returns output rows based on updated rows
         # support same syntax as select data
         returning = self.get_returning(returning, style, params)
 
         table = self.format_identifier(table)
-        rest = self.combine([values, returning], separator="\n", check=True)
+        rest = self.combine([values, conflict, returning], separator="\n", check=True)
         columns = f' {columns}' if columns else ''
         rest = f"\n{rest}" if rest else ""
         return [(f"{indent}{with_}INSERT INTO {table}{columns}{rest}", params)]
 
+    def get_conflict(self, conflict: dict, style, params, depth=0):
+        # - conflict: dict ({"on": ["id"], "update": ["name"]})            # upsert
+        #                  ({"on": ["id"], "update": {"n": {"+": ["n", 1]}}})
+        #                  ({"on": ["id"]})                                 # skip duplicates
+        if not conflict:
+            return None
+
+        indent = self.get_indent(depth + 1)
+        on = conflict.get("on")
+        update = conflict.get("update")
+        if isinstance(on, str):
+            on = [on]
+        target = ""
+        if on:
+            target = self.combine(
+                [self.format_identifier(o) for o in on], separator=", "
+            )
+            target = f" ({target})"
+
+        if not update:
+            return f"ON CONFLICT{target} DO NOTHING"
+        if not on:
+            raise ValueError('insert: conflict update requires "on"')
+
+        if isinstance(update, list):
+            # update these columns from the rejected row
+            update = [self.format_identifier(u) for u in update]
+            update = [f"{u} = EXCLUDED.{u}" for u in update]
+            update = self.combine(update, separator=f",\n{indent}")
+            update = f"{indent}{update}"
+        else:
+            update = self.get_update_set(update, style, params, depth=depth + 1)
+        return f"ON CONFLICT{target} DO UPDATE SET\n{update}"
+
     def get_returning(
         self, returning: Union[list, str, dict], style, params, prefix=True
     ):
@@ -704,6 +745,7 @@ class SQLBuilder(Builder):
         # dict[string] ({"u": "users"})           # aliased name
         # dict[dict]   ({"u": {"select": ...}})   # aliased subquery
         #              ({"u": {"lateral": {...}}  # modifier e.g. LATERAL
+        #              ({"v": {"values": [...], "columns": [...]}})  # VALUES list
         # list         ([...])                    # list of the above
         indent = self.get_indent(depth)
         if prefix:
@@ -727,7 +769,20 @@ class SQLBuilder(Builder):
 
                 elif isinstance(target, dict):
                     target_key = next(iter(target.keys()))
-                    if self.is_command(target_key):
+                    if "values" in target:
+                        # VALUES list in FROM, named by its columns
+                        columns = target.get("columns")
+                        if columns:
+                            columns = self.combine(
+                                [self.format_identifier(c) for c in columns],
+                                separator=", "
+                            )
+                            name = f"{name} ({columns})"
+                        target = self.get_values(
+                            target["values"], style, params, depth=depth
+                        )
+                        target = f"(\n{indent}{target}\n{indent})"
+                    elif self.is_command(target_key):
                         # subquery in FROM
                         # TODO: support for LATERAL
                         target = self.get_subquery(target, style, params, depth=depth)
@@ -903,18 +958,26 @@ class SQLBuilder(Builder):
 
     def get_select_limit(self, limit, style, params, depth=0) -> str:
         # - limit:   integer      (1)                                   # an integer
+        #            dict         ({"literal": 1})                      # an expression
         if limit is None:
             return None
         indent = self.get_indent(depth)
-        limit = int(limit)
+        if isinstance(limit, dict):
+            limit = self.get_expression(limit, style, params, indent=False)
+        else:
+            limit = int(limit)
         return f"{indent}LIMIT {limit}"
 
     def get_select_offset(self, offset, style, params, depth=0) -> str:
         # - offset:  integer      (1)                                   # an integer
+        #            dict         ({"literal": 1})                      # an expression
         if offset is None:
             return None
         indent = self.get_indent(depth)
-        offset = int(offset)
+        if isinstance(offset, dict):
+            offset = self.get_expression(offset, style, params, indent=False)
+        else:
+            offset = int(offset)
         return f"{indent}OFFSET {offset}"
 
     def get_indent(self, depth=0):
@@ -962,7 +1025,12 @@ class SQLBuilder(Builder):
             # in PreQL: {"a": expr, "b": expr}
             for name, value in clause.items():
                 name = self.format_identifier(name)
-                value = self.get_expression(value, style, params, indent=False)
+                if isinstance(value, dict) and self.is_command(next(iter(value))):
+                    # scalar subquery
+                    value = self.get_subquery(value, style, params, depth=depth)
+                    value = f"(\n{value}\n{indent})"
+                else:
+                    value = self.get_expression(value, style, params, indent=False)
                 result.append(f"{name} = {value}")
             result = self.combine(result, separator=f",\n{indent}")
         elif isinstance(clause, list):
@@ -1011,13 +1079,8 @@ class SQLBuilder(Builder):
 
         set_ = self.get_update_set(set_, style, params, depth=depth + 1)
         if from_:
-            if not isinstance(from_, list):
-                from_ = [from_]
-            # TODO: support update with subquery in FROM
-            from_ = self.combine(
-                [self.format_identifier(f) for f in from_], separator=", "
-            )
-            from_ = f"FROM {from_}"
+            # same syntax as select from
+            from_ = self.get_select_from(from_, style, params, depth=depth)
 
         if where:
             where = self.get_expression(where, style, params, depth=depth)
@@ -1850,10 +1913,11 @@ class SQLBuilder(Builder):
                         quote = value1[0]
                         new_value = value1[1:-1]
                         new_value = f"{quote}%{new_value}%{quote}"
-                        value[1] = new_value
                     else:
                         # identifier
-                        value[1] = {"concat": ["%", value1, "%"]}
+                        new_value = {"concat": ["%", value1, "%"]}
+                    # copy: queries can be built more than once
+                    value = [value[0], new_value]
                     # {"contains": ["a", "'c'"]}
                     # -> {"like": ["a", "'%c%'"]}
 
@@ -1948,6 +2012,21 @@ class SQLBuilder(Builder):
                 if key == "raw":
                     result = value
                     return f"{indent}{result}"
+                if key == "cast":
+                    # {"cast": [expression, type]} -> CAST(expression AS type)
+                    value, type = value
+                    if not self.validate_type(type):
+                        raise ValueError(f'cast: invalid type "{type}"')
+                    result = self.get_expression(
+                        value,
+                        style,
+                        params,
+                        allow_subquery=allow_subquery,
+                        raw=raw,
+                        indent=False,
+                        depth=depth,
+                    )
+                    return f"{indent}CAST({result} AS {type})"
 
                 # fallback assumption: a function expression, e.g. {"md5": "a"} -> md5("a")
                 # user-defined functions can exist
@@ -28,3 +28,14 @@ class SqliteBuilder(SQLBuilder):
     def can_defer(self, constraint):
         # only FK constraints can be deferred in SQLite
         return constraint['type'] == 'foreign'
+
+    def build_truncate(self, clause, style, depth=0, params=None):
+        # SQLite has no TRUNCATE: an unfiltered DELETE is optimized instead
+        if isinstance(clause, list):
+            return [
+                q for c in clause
+                for q in self.build_truncate(c, style, depth, params)
+            ]
+        name = clause if isinstance(clause, str) else clause.get('name')
+        indent = self.get_indent(depth)
+        return [(f'{indent}DELETE FROM {self.format_identifier(name)}', params)]
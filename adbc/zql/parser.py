@@ -1,13 +1,31 @@
+from copy import deepcopy
+from adbc.cache import CacheBucket, MISSING
 from .dialect import Backend
 from .parsers import get_parser
 
+# parsed expressions, keyed by (backend, expression)
+# column defaults repeat heavily across a catalog
+# e.g. "now()", "false", "nextval('...'::regclass)"
+EXPRESSION_CACHE_SIZE = 4096
+expression_cache = CacheBucket(size=EXPRESSION_CACHE_SIZE)
+
+
 def parse_expression(
     expression: str,
     backend: Backend
 ):
     """parse SQL expression into ZQL"""
-    parser = get_parser(backend)
-    return parser.parse_expression(expression)
+    if not isinstance(expression, str):
+        return expression
+
+    key = (backend, expression)
+    result = expression_cache.get(key)
+    if result is MISSING:
+        parser = get_parser(backend)
+        result = expression_cache.set(key, parser.parse_expression(expression))
+
+    # callers may modify the result, do not share the cached copy
+    return deepcopy(result) if isinstance(result, (dict, list)) else result
 
 
 def parse_statement(
@@ -1,12 +1,23 @@
+import os
 import re
 
-from adbc.store.table import Table
 from adbc.utils import named_dict_to_list
 from pyparsing import (
     CaselessKeyword, Forward, Word, Regex, alphanums,
-    delimitedList, Suppress, Optional, Group, OneOrMore
+    delimitedList, Suppress, Optional, Group, OneOrMore,
+    ParserElement
 )
 
+# the DDL grammar backtracks heavily across its alternatives
+# pyparsing packrat caching is process-wide: enabling it affects every
+# pyparsing grammar, so it is only enabled once DDL is parsed,
+# and can be turned off with ADBC_PACKRAT_CACHE_SIZE=0
+PACKRAT_CACHE_SIZE = int(os.environ.get('ADBC_PACKRAT_CACHE_SIZE', 1024))
+
+
+def enable_packrat():
+    if PACKRAT_CACHE_SIZE and not ParserElement._packratEnabled:
+        ParserElement.enablePackrat(cache_size_limit=PACKRAT_CACHE_SIZE)
 
 
 class SQLParser():
@@ -259,6 +270,7 @@ class SQLParser():
         if not sql:
             raise ValueError('`sql` is not specified')
 
+        enable_packrat()
         parsed = self.PARSE.parseString(sql)
         result = {}
         if 'table' not in parsed:
@@ -282,8 +294,12 @@ class SQLParser():
                 constraints.append(self.get_constraint_definition(item))
 
         # use adbc.store.Table to update the constraints/columns
+        from adbc.store.table import Table
+
         name = table
         table = Table(name, backend=self, columns=columns, constraints=constraints)
-        result['columns'] = named_dict_to_list(table.columns)
+        result['columns'] = named_dict_to_list({
+            name: dict(column) for name, column in table.columns.items()
+        })
         result['constraints'] = named_dict_to_list(table.constraints)
         return {'create': {'table': result}}
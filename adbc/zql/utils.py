@@ -1,3 +1,6 @@
+import datetime
+
+
 def literal(x):
     """Make literal"""
     if isinstance(x, str):
@@ -15,3 +18,181 @@ def literal(x):
         return {k: literal(v) for k, v in x.items()}
 
     return x
+
+
+COMPARISONS = {'=', '!=', '<>', '<', '<=', '>', '>='}
+QUOTES = {"'", '"'}
+
+
+class Parameter(object):
+    """Placeholder for a value hoisted out of a query template"""
+    __slots__ = ('index', )
+
+    def __init__(self, index):
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, Parameter) and other.index == self.index
+
+    def __hash__(self):
+        return hash((Parameter, self.index))
+
+    def __repr__(self):
+        return f'Parameter({self.index})'
+
+
+def is_identifier(x):
+    if isinstance(x, str):
+        return bool(x) and x != '*' and x[0] not in QUOTES and x[0] != '`'
+    if isinstance(x, list):
+        return True
+    return isinstance(x, dict) and len(x) == 1 and 'identifier' in x
+
+
+def is_hoistable(x):
+    if isinstance(x, bool):
+        return True
+    if isinstance(x, (int, float, datetime.date, datetime.time)):
+        return True
+    if isinstance(x, str):
+        return len(x) > 1 and x[0] == x[-1] and x[0] in QUOTES
+    return isinstance(x, dict) and len(x) == 1 and 'literal' in x
+
+
+def hoist(x, values):
+    """Replace a literal with a parameter placeholder"""
+    if isinstance(x, str):
+        # quoted literal: the builder binds the unquoted value
+        value = x[1:-1]
+    elif isinstance(x, dict):
+        value = x['literal']
+    else:
+        value = x
+    values.append(value)
+    return {'literal': Parameter(len(values) - 1)}
+
+
+def templatize(query, values):
+    """Hoist literal values out of a query
+
+    Replaces literals compared against identifiers (including IN lists)
+    and explicit {"literal": ...} values with parameter placeholders, so
+    that queries that only differ in these values share one template
+
+    Arguments:
+        query: zql query, not modified
+        values: list, hoisted values are appended in placeholder order
+
+    Returns:
+        query template
+    """
+    cls = query.__class__
+    if cls is list:
+        return [templatize(q, values) for q in query]
+    if cls is not dict:
+        return query
+    if len(query) == 1:
+        key, value = next(iter(query.items()))
+        if key == 'literal':
+            return hoist(query, values)
+        if value.__class__ is list and len(value) == 2:
+            left, right = value
+            if key in COMPARISONS:
+                if is_identifier(left) and is_hoistable(right):
+                    return {key: [templatize(left, values), hoist(right, values)]}
+                if is_identifier(right) and is_hoistable(left):
+                    return {key: [hoist(left, values), templatize(right, values)]}
+            elif (
+                key == 'in' and
+                is_identifier(left) and
+                isinstance(right, list) and
+                right and
+                all(is_hoistable(r) for r in right)
+            ):
+                return {key: [
+                    templatize(left, values),
+                    [hoist(r, values) for r in right]
+                ]}
+        return {key: templatize(value, values)}
+    return {key: templatize(value, values) for key, value in query.items()}
+
+
+def bind(params, values):
+    """Replace parameter placeholders with their values"""
+    if not params:
+        return params
+    return [
+        values[p.index] if isinstance(p, Parameter) else p
+        for p in params
+    ]
+
+
+WRITE_COMMANDS = {'insert', 'update', 'delete', 'truncate'}
+# commands that can change any table
+SCHEMA_COMMANDS = {'create', 'alter', 'drop'}
+# any table
+ALL_TABLES = '*'
+
+
+def get_table_name(identifier):
+    # "public.users" or ["public", "users"] -> "users"
+    if isinstance(identifier, list):
+        identifier = identifier[-1] if identifier else None
+    if not isinstance(identifier, str):
+        return None
+    return identifier.split('.')[-1]
+
+
+def get_tables(query, reads=None, writes=None):
+    """Get names of the tables that a query reads from and writes to
+
+    Tables are found in from/join clauses and in write commands,
+    schema commands write to ALL_TABLES. Names are not schema-qualified
+
+    Returns:
+        (reads, writes): sets of table names
+    """
+    reads = set() if reads is None else reads
+    writes = set() if writes is None else writes
+    if isinstance(query, list):
+        for q in query:
+            get_tables(q, reads, writes)
+    elif isinstance(query, dict):
+        for key, value in query.items():
+            if key == 'from':
+                get_from_tables(value, reads, writes)
+                continue
+            if key == 'join':
+                for join in value if isinstance(value, list) else [value]:
+                    if isinstance(join, dict):
+                        get_from_tables(join.get('to'), reads, writes)
+                        get_tables(join.get('on'), reads, writes)
+                continue
+            if key in SCHEMA_COMMANDS:
+                writes.add(ALL_TABLES)
+            elif key in WRITE_COMMANDS:
+                targets = value.get('table') if isinstance(value, dict) else value
+                if isinstance(targets, str):
+                    targets = [targets]
+                for target in targets or []:
+                    name = get_table_name(target)
+                    if name:
+                        writes.add(name)
+            get_tables(value, reads, writes)
+    return reads, writes
+
+
+def get_from_tables(from_, reads, writes):
+    # see SQLBuilder.get_select_from
+    if isinstance(from_, str):
+        reads.add(get_table_name(from_))
+    elif isinstance(from_, list):
+        for f in from_:
+            get_from_tables(f, reads, writes)
+    elif isinstance(from_, dict):
+        for target in from_.values():
+            if isinstance(target, str):
+                reads.add(get_table_name(target))
+            else:
+                # subquery, VALUES or function
+                get_tables(target, reads, writes)
@@ -0,0 +1,110 @@
+import time
+from array import array
+from adbc.cache import WithCache, CacheBucket, ResultCache, freeze, MISSING
+
+
+def test_freeze():
+    assert freeze({'a': [1, {'b': 2}]}) == freeze({'a': [1, {'b': 2}]})
+    assert freeze({'a': 1, 'b': 2}) == freeze({'b': 2, 'a': 1})
+    assert freeze(['a', 'b']) != freeze({'a': 'b'})
+    hash(freeze({'schemas': {'public': {'*': True}}}))
+    # equal values of different types are different keys
+    assert len({freeze(True), freeze(1), freeze(1.0)}) == 3
+    assert freeze([1, 2]) != freeze((1, 2))
+    assert freeze({'a': [True]}) != freeze({'a': [1]})
+    assert freeze({('a', 1)}) != freeze({'a': 1})
+
+
+def test_cache_bucket_lru():
+    bucket = CacheBucket(size=2)
+    bucket.set('a', 1)
+    bucket.set('b', 2)
+    assert bucket.get('a') == 1
+    # "b" is now least recently used
+    bucket.set('c', 3)
+    assert 'b' not in bucket
+    assert bucket.get('a') == 1
+    assert bucket.get('c') == 3
+    stats = bucket.get_stats()
+    assert stats['size'] == 2
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 3
+
+
+def test_cache_bucket_ttl():
+    bucket = CacheBucket(ttl=0.01)
+    bucket.set('a', 1)
+    assert bucket.get('a') == 1
+    time.sleep(0.02)
+    assert 'a' not in bucket
+
+
+def test_with_cache():
+    class Cached(WithCache):
+        cache_policies = {'small': {'size': 1}}
+
+    cached = Cached()
+    calls = []
+
+    def method(value):
+        def inner():
+            calls.append(value)
+            return value
+        return inner
+
+    key = {'scope': {'schemas': {'public': True}}, 'name': 'a'}
+    assert cached.cache_by('tables', key, method('a')) == 'a'
+    assert cached.cache_by('tables', dict(key), method('b')) == 'a'
+    assert calls == ['a']
+
+    cached.cache_by('small', 'x', method('x'))
+    cached.cache_by('small', 'y', method('y'))
+    cached.cache_by('small', 'x', method('x'))
+    assert calls == ['a', 'x', 'y', 'x']
+
+    stats = cached.get_cache_stats()
+    assert stats['tables']['hits'] == 1
+    assert stats['tables']['misses'] == 1
+    assert stats['small']['size'] == 1
+
+
+def test_result_cache():
+    cache = ResultCache(size=10, ttl=None)
+    cache.set('users', 1, ['users'])
+    cache.set('users_groups', 2, ['users', 'groups'])
+    cache.set('groups', 3, ['groups'])
+    cache.invalidate(['users'])
+    assert cache.get('users') is MISSING
+    assert cache.get('users_groups') is MISSING
+    assert cache.get('groups') == 3
+
+    # results read before a write are not cached after it
+    versions = cache.get_versions(['users'])
+    cache.invalidate(['users'])
+    cache.set('users', 1, ['users'], versions)
+    assert cache.get('users') is MISSING
+
+    # schema changes invalidate everything
+    versions = cache.get_versions(['other'])
+    cache.invalidate(['*'])
+    assert cache.get('groups') is MISSING
+    cache.set('other', 4, ['other'], versions)
+    assert len(cache) == 0
+
+
+def test_result_cache_copies():
+    cache = ResultCache(size=10, ttl=None)
+    row = ('a', 1)
+    result = cache.set('rows', [row], ['test'])
+    result.append(('b', 2))
+    columns = cache.set('columns', {'id': array('q', [1, 2])}, ['test'])
+    columns['id'][0] = 0
+
+    # callers cannot change cached results
+    rows = cache.get('rows')
+    assert rows == [row] and rows[0] is row
+    rows.clear()
+    assert cache.get('rows') == [row]
+    assert cache.get('columns') == {'id': array('q', [1, 2])}
+    cache.get('columns')['id'].append(3)
+    assert cache.get('columns') == {'id': array('q', [1, 2])}
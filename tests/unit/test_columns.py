@@ -0,0 +1,28 @@
+from array import array
+from adbc import columns as columns_module
+from adbc.columns import to_columns
+
+
+class Row(tuple):
+    # minimal record with keys(), like asyncpg Record or aiosqlite Row
+    def keys(self):
+        return ['id', 'score', 'name', 'flag', 'big']
+
+
+def test_to_columns(monkeypatch):
+    monkeypatch.setattr(columns_module, 'numpy', None)
+    rows = [
+        Row((1, 1.5, 'a', True, 2 ** 70)),
+        Row((2, 2.5, None, False, 1)),
+    ]
+    result = to_columns(rows)
+    assert list(result) == ['id', 'score', 'name', 'flag', 'big']
+    assert result['id'] == array('q', [1, 2])
+    assert result['score'] == array('d', [1.5, 2.5])
+    assert result['name'] == ['a', None]
+    assert result['flag'] == [True, False]
+    # too large for a fixed-width array
+    assert result['big'] == [2 ** 70, 1]
+
+    assert to_columns([]) == {}
+    assert to_columns([], names=['id']) == {'id': []}
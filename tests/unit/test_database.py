@@ -0,0 +1,527 @@
+import asyncio
+import logging
+import pytest
+from adbc.store import Database
+from adbc.store import database as database_module
+from adbc.store.pools import pools as registry
+from adbc.backends.sqlite import SqliteBackend
+from adbc.utils import statement_timeout
+
+
+@pytest.mark.asyncio
+async def test_query_logging(tmp_path, monkeypatch):
+    url = f'file:{tmp_path}/test.db'
+    logger = logging.getLogger('adbc.test_query_logging')
+    logger.setLevel(logging.INFO)
+    db = Database(url=url, logger=logger)
+
+    def print_query(query, params):
+        raise AssertionError('query should not be formatted')
+
+    # queries are not formatted unless they will be shown
+    with monkeypatch.context() as patch:
+        patch.setattr(database_module, 'print_query', print_query)
+        await db.execute('CREATE TABLE test (id integer)')
+        await db.execute('INSERT INTO test VALUES (1), (2)')
+        assert await db.query_one_value('SELECT count(*) FROM test') == 2
+
+    records = []
+
+    class Handler(logging.Handler):
+        def emit(self, record):
+            records.append(record)
+
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(Handler())
+    rows = await db.query({'select': {'data': 'id', 'from': 'test'}})
+    assert len(rows) == 2
+    start, done = records
+    assert start.query_id == done.query_id
+    assert 'SELECT' in start.getMessage()
+    assert done.rows == 2
+    assert done.duration >= 0
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_add_batches(tmp_path):
+    db = Database(url=f'file:{tmp_path}/test.db')
+    await db.execute(
+        'CREATE TABLE test (id integer primary key, name text, n integer)'
+    )
+    model = await db.get_model('test')
+    rows = [{'id': i, 'name': f"it's {i}", 'n': i} for i in range(2500)]
+
+    # batches are limited by the parameter limit: 999 // 3 = 333 rows
+    queries = await model.values(rows).add(zql=True)
+    assert len(queries) == 8
+    assert len(queries[0]['insert']['values']) == 333
+    queries = await model.values(rows).add(zql=True, batch_size=1000)
+    assert len(queries) == 8
+    queries = await model.values(rows).add(zql=True, batch_size=100)
+    assert len(queries) == 25
+
+    assert await model.values(rows).add() == 2500
+    assert await db.query_one_value('SELECT count(*) FROM test') == 2500
+    assert await db.query_one_value(
+        'SELECT name FROM test WHERE id = 1'
+    ) == "it's 1"
+
+    # upsert: update existing rows by primary key
+    rows = [{'id': i, 'name': 'new', 'n': -i} for i in range(2000, 3000)]
+    assert await model.values(rows).add(upsert=True, batch_size=300) == 1000
+    assert await db.query_one_value('SELECT count(*) FROM test') == 3000
+    assert await db.query_one_column(
+        'SELECT n FROM test WHERE id IN (1999, 2000, 2999) ORDER BY id'
+    ) == [1999, -2000, -2999]
+
+    # batches are added in one transaction
+    rows = [{'id': 5000, 'name': 'a', 'n': 0}, {'id': 1, 'name': 'a', 'n': 0}]
+    with pytest.raises(Exception):
+        await model.values(rows).add(batch_size=1)
+    assert await db.query_one_value(
+        'SELECT count(*) FROM test WHERE id = 5000'
+    ) == 0
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_set_many(tmp_path):
+    db = Database(url=f'file:{tmp_path}/test.db')
+    await db.execute(
+        'CREATE TABLE test (a integer, b integer, name text, n integer)'
+    )
+    model = await db.get_model('test')
+    await model.values([
+        {'a': i % 10, 'b': i // 10, 'name': 'old', 'n': i} for i in range(1000)
+    ]).add()
+
+    rows = [
+        {'a': i % 10, 'b': i // 10, 'name': 'new', 'n': -i}
+        for i in range(500, 1500)
+    ]
+    async with db.transaction() as connection:
+        assert await model.values(rows).set(
+            by=['a', 'b'], batch_size=300, connection=connection
+        ) == 500
+        # the temporary table is dropped
+        assert await db.query_one_value(
+            'SELECT count(*) FROM temp.sqlite_master', connection=connection
+        ) == 0
+
+    assert await db.query_one_column(
+        'SELECT n FROM test WHERE n IN (499, -500, -999) ORDER BY n'
+    ) == [-999, -500, 499]
+    assert await db.query_one_value(
+        "SELECT count(*) FROM test WHERE name = 'new'"
+    ) == 500
+
+    with pytest.raises(ValueError):
+        await model.values([{'name': 'x'}]).set(by='a')
+
+    # rows with missing or extra columns are rejected,
+    # rather than setting the missing columns to their defaults
+    for row in ({'a': 1, 'b': 1}, {'a': 1, 'b': 1, 'name': 'x', 'n': 0}):
+        rows = [{'a': 0, 'b': 1, 'name': 'mixed'}, row]
+        with pytest.raises(ValueError) as error:
+            await model.values(rows).set(by=['a', 'b'])
+        assert 'every row must have columns' in str(error.value)
+        with pytest.raises(ValueError):
+            await model.values(rows).add()
+    assert await db.query_one_value(
+        "SELECT count(*) FROM test WHERE name = 'mixed'"
+    ) == 0
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_iterate(tmp_path):
+    db = Database(url=f'file:{tmp_path}/test.db')
+    await db.execute(
+        'CREATE TABLE test (a integer, b integer, n integer, PRIMARY KEY (a, b))'
+    )
+    model = await db.get_model('test')
+    await model.values([{'a': i % 7, 'b': i, 'n': i} for i in range(1000)]).add()
+
+    # keyset pagination on the composite primary key
+    queries = []
+    query = db.query
+
+    async def counted(*args, **kwargs):
+        queries.append(args)
+        return await query(*args, **kwargs)
+
+    db.query = counted
+    rows = [
+        row['n'] async for row in
+        model.where({'<': ['n', 900]}).iterate(batch_size=64)
+    ]
+    assert sorted(rows) == list(range(900))
+    assert len(queries) == 15
+    del db.query
+
+    assert len([row async for row in model]) == 1000
+    # without the primary key: server-side cursor
+    rows = [row['n'] async for row in model.take('n').iterate(batch_size=10)]
+    assert len(rows) == 1000
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_get_many(tmp_path):
+    db = Database(url=f'file:{tmp_path}/test.db')
+    await db.execute('CREATE TABLE test (id integer primary key, n integer)')
+    await db.execute(
+        'CREATE TABLE pairs (a integer, b integer, n integer, PRIMARY KEY (a, b))'
+    )
+    model = await db.get_model('test')
+    await model.values([{'id': i, 'n': i} for i in range(3000)]).add()
+
+    # batches are bounded by the parameter limit
+    records = await model.take('n').get_many(range(0, 4000, 2))
+    assert len(records) == 1500
+    assert records[2998]['n'] == 2998
+    assert 3000 not in records
+
+    pairs = await db.get_model('pairs')
+    await pairs.values([{'a': i % 3, 'b': i, 'n': i} for i in range(600)]).add()
+    records = await pairs.where({'>': ['n', 10]}).get_many(
+        [(i % 3, i) for i in range(0, 600, 5)], batch_size=50
+    )
+    assert len(records) == 117
+    assert records[(2, 20)]['n'] == 20
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_query_columns(tmp_path):
+    db = Database(url=f'file:{tmp_path}/test.db')
+    await db.execute('CREATE TABLE test (id integer, name text)')
+    model = await db.get_model('test')
+    await model.values([{'id': i, 'name': str(i)} for i in range(25)]).add()
+
+    query = 'SELECT id, name FROM test ORDER BY id'
+    result = await db.query_columns(query)
+    assert list(result['id']) == list(range(25))
+    assert result['name'] == [str(i) for i in range(25)]
+
+    chunks = [
+        chunk async for chunk in
+        db.stream(query, prefetch=10, fetch_format='columns')
+    ]
+    assert [len(chunk['id']) for chunk in chunks] == [10, 10, 5]
+    assert list(chunks[2]['id']) == [20, 21, 22, 23, 24]
+
+    # empty results keep their columns
+    empty = 'SELECT id, name FROM test WHERE id < 0'
+    assert await db.query_columns(empty) == {'id': [], 'name': []}
+    assert await db.query_columns(empty, columns=False) == []
+    assert await db.query_columns(
+        {'select': {'data': ['id'], 'from': 'test', 'where': {'<': ['id', 0]}}}
+    ) == {'id': []}
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_result_cache(tmp_path):
+    db = Database(url=f'file:{tmp_path}/test.db', result_cache={'ttl': 60})
+    await db.execute('CREATE TABLE test (id integer primary key, n integer)')
+    await db.execute('CREATE TABLE other (id integer primary key)')
+    model = await db.get_model('test')
+    await model.values([{'id': i, 'n': i} for i in range(10)]).add()
+
+    total = {'select': {'data': {'total': {'sum': 'n'}}, 'from': 'test'}}
+    count = {'select': {'data': {'count': {'count': '*'}}, 'from': 'other'}}
+    assert await db.query_one_value(total) == 45
+    assert await db.query_one_value(total) == 45
+    assert await db.query_one_value(count) == 0
+    assert db.get_result_cache_stats()['hits'] == 1
+
+    # writes to a table invalidate queries that read it
+    await model.key(1).values({'n': 101}).set()
+    assert await db.query_one_value(total) == 145
+    await model.values({'id': 10, 'n': 10}).add()
+    assert await db.query_one_value(total) == 155
+    await model.key(10).delete()
+    assert await db.query_one_value(total) == 145
+    # ... but not others
+    assert await db.query_one_value(count) == 0
+    assert db.get_result_cache_stats()['hits'] == 2
+
+    # SQL queries are not cached
+    await db.query('SELECT * FROM test')
+    assert db.get_result_cache_stats()['misses'] == 5
+
+    # SQL writes invalidate every query
+    await db.execute('INSERT INTO other VALUES (1)')
+    assert await db.query_one_value(count) == 1
+    assert await db.query_one_value(total) == 145
+    assert db.get_result_cache_stats()['misses'] == 7
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_pools(tmp_path):
+    url = f'file:{tmp_path}/test.db'
+    source = Database(url=url, tag='source')
+    target = Database(url=url, tag='target')
+    other = Database(url=url, max_pool_size=3)
+
+    pools = await asyncio.gather(source.pool, target.pool, source.pool)
+    assert pools[0] is pools[1] is pools[2]
+    assert await other.pool is not pools[0]
+    assert registry.pools[source.get_pool_key()][1] == 2
+    # one connection budget per host, for the largest pool
+    assert source.host_limiter is other.host_limiter
+    assert other.host_limiter.value == 20
+    bigger = Database(url=url, max_pool_size=30)
+    assert bigger.host_limiter is source.host_limiter
+    assert source.host_limiter.value == 30
+
+    # pools left by a previous event loop are closed
+    stale = await SqliteBackend.create_pool(url)
+    key = registry.get_key('stale')
+    registry.pools[key] = [stale, 1, object()]
+    assert await registry.acquire(key, lambda: SqliteBackend.create_pool(url)) is not stale
+    assert stale.closed
+    await registry.release(key)
+
+    await source.close()
+    assert await target.query_one_value('SELECT 1') == 1
+    await target.close()
+    assert source.get_pool_key() not in registry.pools
+    assert pools[0].closed
+    await other.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_host_budget(tmp_path):
+    url = f'file:{tmp_path}/test.db'
+    source = Database(url=url, max_pool_size=3)
+    target = Database(url=url, max_pool_size=3)
+    await source.execute('CREATE TABLE a (id integer primary key, name text)')
+    await source.execute('CREATE TABLE b (id integer primary key, name text)')
+    await source.execute(
+        'INSERT INTO a SELECT value, value FROM json_each($1)',
+        [str(list(range(1, 61)))]
+    )
+    source_model = await source.get_model('a')
+    target_model = await target.get_model('b')
+
+    # more shards than host slots: each shard holds a host slot
+    # for its target transaction, and reads the source in it
+    shards = [
+        source._copy_shard(
+            source_model, target_model, target, 'id', 'main', 'a',
+            'main', 'b', False, False, cursor, cursor + 10
+        )
+        for cursor in range(0, 60, 10)
+    ]
+    try:
+        assert await asyncio.wait_for(asyncio.gather(*shards), 5) == [10] * 6
+        assert await target.query_one_value('SELECT count(*) FROM b') == 60
+    finally:
+        await source.close()
+        await target.close()
+
+
+@pytest.mark.asyncio
+async def test_copy_shard_bounds(tmp_path):
+    db = Database(url=f'file:{tmp_path}/test.db')
+    await db.execute('CREATE TABLE a (id integer primary key, name text)')
+    await db.execute('CREATE TABLE b (id integer primary key, name text)')
+    await db.execute(
+        'INSERT INTO a SELECT value, value FROM json_each($1)',
+        [str(list(range(-4, 6)))]
+    )
+    source_model = await db.get_model('a')
+    target_model = await db.get_model('b')
+
+    # a lower bound of 0 is still a bound
+    assert await db._copy_shard(
+        source_model, target_model, db, 'id', 'main', 'a',
+        'main', 'b', False, False, 0, 5
+    ) == 5
+    assert await db.query_one_column('SELECT id FROM b') == [1, 2, 3, 4, 5]
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_warm_up(tmp_path):
+    db = Database(
+        url=f'file:{tmp_path}/test.db',
+        max_pool_size=4,
+        health_check_interval=0.01
+    )
+    assert await db.query_one_value('SELECT 1') == 1
+    # one connection until warmed up
+    assert db.get_pool_stats()['readers'] == 1
+    await db.warm_up()
+    assert db.get_pool_stats()['readers'] == 3
+
+    # periodic health checks
+    await db._pool.idle[0].close()
+    await asyncio.sleep(0.05)
+    assert db.get_pool_stats()['evictions'] == 1
+    await db.close()
+    assert db._checking is None
+
+
+@pytest.mark.asyncio
+async def test_timeout(tmp_path):
+    db = Database(url=f'file:{tmp_path}/test.db', timeout=0.05)
+    slow = (
+        'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) '
+        'SELECT count(*) FROM c'
+    )
+    with pytest.raises(Exception) as error:
+        await db.query_one_value(slow)
+    assert 'interrupted' in str(error.value)
+
+    # per-task timeouts override the database timeout, e.g. for a step
+    token = statement_timeout.set(0)
+    try:
+        query = asyncio.ensure_future(db.query_one_value(slow))
+        await asyncio.sleep(0.1)
+        assert not query.done()
+        # cancelling the task interrupts the query
+        query.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await query
+    finally:
+        statement_timeout.reset(token)
+    assert await db.query_one_value('SELECT 1') == 1
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_replicas(tmp_path):
+    urls = []
+    for name in ('primary', 'replica1', 'replica2'):
+        url = f'file:{tmp_path}/{name}.db'
+        db = Database(url=url)
+        await db.execute('CREATE TABLE test (name TEXT)')
+        await db.execute('INSERT INTO test VALUES ($1)', [name])
+        await db.close()
+        urls.append(url)
+
+    primary, *replicas = urls
+    db = Database(url=primary, replicas=replicas)
+    # reads alternate between replicas
+    assert [await db.query_one_value('SELECT name FROM test') for _ in range(3)] == [
+        'replica1', 'replica2', 'replica1'
+    ]
+    assert [row[0] async for row in db.stream('SELECT name FROM test')] == ['replica2']
+    assert await db.query_one_value({'select': {'data': 'name', 'from': 'test'}}) == 'replica1'
+
+    # writes, and reads in a transaction, stay on the primary
+    await db.execute('INSERT INTO test VALUES ($1)', ['written'])
+    async with db.transaction() as connection:
+        assert await db.query_one_column(
+            'SELECT name FROM test', connection=connection
+        ) == ['primary', 'written']
+    await db.close()
+
+    db = Database(
+        url=primary,
+        replicas={'urls': replicas, 'strategy': 'least_busy', 'max_lag': 1}
+    )
+    # SQLite replicas never lag
+    assert await db.query_one_value('SELECT name FROM test') == 'replica1'
+    db.replicas.lags = {0: (2, float('inf')), 1: (2, float('inf'))}
+    # fallback to the primary
+    assert await db.query_one_value('SELECT name FROM test LIMIT 1') == 'primary'
+    db.replicas.fallback = False
+    with pytest.raises(Exception):
+        await db.query_one_value('SELECT name FROM test')
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_replicas_read_after_write(tmp_path):
+    urls = []
+    for name in ('primary', 'replica'):
+        url = f'file:{tmp_path}/{name}.db'
+        db = Database(url=url)
+        for table in ('test', 'other'):
+            await db.execute(f'CREATE TABLE {table} (name TEXT)')
+            await db.execute(f'INSERT INTO {table} VALUES ($1)', [name])
+        await db.close()
+        urls.append(url)
+
+    primary, replica = urls
+    db = Database(url=primary, replicas=[replica], result_cache=True)
+    select = {'select': {'data': 'name', 'from': 'test'}}
+    # replica results are not cached
+    assert await db.query_one_value(select) == 'replica'
+    assert await db.query_one_value(select) == 'replica'
+    assert db.get_result_cache_stats()['size'] == 0
+
+    # written tables, and SQL of unknown tables, are read from the primary
+    await db.execute({'insert': {'table': 'other', 'values': ['written']}})
+    assert await db.query_one_value(select) == 'replica'
+    assert await db.query_one_column(
+        {'select': {'data': 'name', 'from': 'other'}}
+    ) == ['primary', 'written']
+    # primary results are cached
+    assert db.get_result_cache_stats()['size'] == 1
+    assert await db.query_one_value('SELECT name FROM test') == 'primary'
+
+    # until replicas have caught up
+    db.replicas.read_after_write = 0
+    assert await db.query_one_value('SELECT name FROM test') == 'replica'
+    # SQL may write to any table
+    await db.execute('UPDATE test SET name = $1', ['updated'])
+    db.replicas.read_after_write = 60
+    assert await db.query_one_value(select) == 'updated'
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_batch(tmp_path):
+    db = Database(url=f'file:{tmp_path}/test.db')
+    table = {'create': {'table': {'name': 'test', 'columns': {'id': {'type': 'integer'}}}}}
+    async with db.batch():
+        assert await db.execute(table) is None
+        async with db.batch():
+            await db.execute({'insert': {'table': 'test', 'values': [1]}})
+        # deferred until the end of the batch
+        assert await db.query_one_value(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'test'"
+        ) == 0
+    assert await db.query_one_column('SELECT id FROM test') == [1]
+
+    # batches are atomic
+    with pytest.raises(Exception):
+        async with db.batch():
+            await db.execute({'insert': {'table': 'test', 'values': [2]}})
+            await db.execute({'insert': {'table': 'missing', 'values': [3]}})
+    assert await db.query_one_column('SELECT id FROM test') == [1]
+
+    # other databases run their statements, or their own batches
+    other = Database(url=f'file:{tmp_path}/other.db')
+    async with db.batch():
+        await db.execute({'insert': {'table': 'test', 'values': [2]}})
+        await other.execute(table)
+        async with other.batch():
+            await other.execute({'insert': {'table': 'test', 'values': [3]}})
+            assert await other.query_one_column('SELECT id FROM test') == []
+        assert await other.query_one_column('SELECT id FROM test') == [3]
+        assert await db.query_one_column('SELECT id FROM test') == [1]
+    assert await db.query_one_column('SELECT id FROM test') == [1, 2]
+    await other.close()
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_nested_write(tmp_path):
+    db = Database(url=f'file:{tmp_path}/test.db', concurrency=1)
+    await db.execute('CREATE TABLE test (id integer)')
+    async with db.transaction() as connection:
+        await db.execute('INSERT INTO test VALUES (1)', connection=connection)
+        # fails instead of waiting for the only slot
+        with pytest.raises(Exception) as error:
+            await db.execute('INSERT INTO test VALUES (2)')
+        assert 'already holds the writer' in str(error.value)
+    assert await db.query_one_column('SELECT id FROM test') == [1]
+    await db.close()
@@ -0,0 +1,208 @@
+import asyncio
+import asyncpg
+import pytest
+from asyncpg.connection import _StatementCache
+from adbc.backends import postgres
+from adbc.backends.postgres import (
+    PostgresBackend, PostgresStatement, StatementCountingConnection
+)
+from adbc.utils import FairSemaphore
+
+
+class InterfaceError(Exception):
+    pass
+
+
+class Protocol(object):
+    def get_record_class(self):
+        return tuple
+
+
+class Statement(object):
+    closed = False
+
+    def get_attributes(self):
+        return [Attribute('id'), Attribute('name')]
+
+
+class Attribute(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class ColumnsConnection(object):
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def fetch(self, query, *args, timeout=None):
+        return self.rows
+
+    async def prepare(self, query, timeout=None):
+        return Statement()
+
+
+async def prepare(self, query, timeout, *, use_cache=True, **kwargs):
+    # asyncpg's Connection._get_statement, without a server
+    key = (query, tuple, False)
+    statement = self._stmt_cache.get(key) if use_cache else None
+    if statement is None:
+        statement = Statement()
+        if use_cache:
+            self._stmt_cache.put(key, statement)
+    return statement
+
+
+class TimeoutConnection(object):
+    def __init__(self):
+        self.queries = []
+
+    async def execute(self, query, *args, timeout=None):
+        self.queries.append((query, timeout))
+
+
+class PingConnection(object):
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.pings = 0
+        self.terminated = False
+
+    async def fetchval(self, query, timeout=None):
+        self.pings += 1
+        if self.broken:
+            raise InterfaceError('connection is closed')
+        return 1
+
+    def terminate(self):
+        self.terminated = True
+
+
+class Pool(object):
+    # mimics asyncpg's pool, which hands out
+    # the last released connection first
+    def __init__(self, connections):
+        self.idle = list(connections)
+
+    def get_idle_size(self):
+        return len(self.idle)
+
+    async def acquire(self):
+        while not self.idle:
+            await asyncio.sleep(0.01)
+        return self.idle.pop()
+
+    async def release(self, connection):
+        assert not connection.terminated
+        self.idle.append(connection)
+
+
+@pytest.mark.asyncio
+async def test_statement_stats(monkeypatch):
+    monkeypatch.setattr(asyncpg.Connection, '_get_statement', prepare)
+    monkeypatch.setattr(StatementCountingConnection, 'hits', 0)
+    monkeypatch.setattr(StatementCountingConnection, 'misses', 0)
+    assert PostgresBackend.get_statement_stats()['hit_rate'] is None
+
+    connection = StatementCountingConnection.__new__(StatementCountingConnection)
+    connection._aborted = True
+    connection._protocol = Protocol()
+    connection._stmt_cache = _StatementCache(
+        loop=asyncio.get_running_loop(),
+        max_size=PostgresBackend.statement_cache_size,
+        on_remove=lambda statement: None,
+        max_lifetime=0
+    )
+    # each query is prepared once per connection, then reused
+    query = 'SELECT * FROM "test" WHERE "id" > $1 LIMIT $2'
+    first = await connection._get_statement(query, None)
+    for _ in range(2):
+        assert await connection._get_statement(query, None) is first
+    await connection._get_statement('SELECT 1', None)
+    # uncached statements, e.g. from prepare, are not counted
+    await connection._get_statement('SELECT 1', None, use_cache=False)
+    assert PostgresBackend.get_statement_stats() == {
+        'hits': 2, 'misses': 2, 'hit_rate': 0.5
+    }
+
+
+@pytest.mark.asyncio
+async def test_statement_cache_size(monkeypatch):
+    options = {}
+
+    async def create_pool(**kwargs):
+        options.update(kwargs)
+
+    monkeypatch.setattr(postgres, 'create_pool', create_pool)
+    await PostgresBackend.create_pool('postgres://localhost/test')
+    assert options['statement_cache_size'] == PostgresBackend.statement_cache_size
+    assert options['connection_class'] is StatementCountingConnection
+
+
+def test_get_row_count():
+    assert PostgresBackend.get_row_count('UPDATE 3') == 3
+    assert PostgresBackend.get_row_count('INSERT 0 5') == 5
+    assert PostgresBackend.get_row_count('CREATE TABLE') is None
+
+
+@pytest.mark.asyncio
+async def test_check_pool(monkeypatch):
+    backend = PostgresBackend()
+    connections = [
+        PingConnection(), PingConnection(broken=True), PingConnection()
+    ]
+    pool = Pool(connections)
+    # every idle connection is pinged once
+    assert await backend.check_pool(pool) == {'checked': 3, 'evicted': 1}
+    assert [c.pings for c in connections] == [1, 1, 1]
+    assert connections[1].terminated
+    assert connections[1] not in pool.idle and len(pool.idle) == 2
+
+    # connections beyond the limits are not checked
+    monkeypatch.setattr(postgres, 'PING_TIMEOUT', 0.05)
+    limiter = FairSemaphore(1)
+    assert await backend.check_pool(pool, limiters=[limiter]) == {
+        'checked': 1, 'evicted': 0
+    }
+    assert limiter._free == 1 and len(pool.idle) == 2
+
+
+@pytest.mark.asyncio
+async def test_statement_timeout():
+    backend = PostgresBackend()
+    connection = TimeoutConnection()
+
+    # shorter than the setting: a client-side timeout, without round trips
+    async with backend.statement(connection, timeout=1, default=5):
+        assert backend.get_timeout(connection) == 1
+        await backend.execute(connection, 'SELECT 1')
+    assert backend.get_timeout(connection) is None
+    assert connection.queries == [('SELECT 1', 1)]
+
+    # longer: the setting is changed, then restored
+    connection.queries = []
+    async with backend.statement(connection, timeout=10, default=5):
+        async with backend.statement(connection, timeout=1, default=5):
+            await backend.execute(connection, 'SELECT 1')
+        async with backend.statement(connection, timeout=0, default=5):
+            assert backend.get_timeout(connection) is None
+    assert connection.queries == [
+        ('SET statement_timeout = 10000', None),
+        ('SELECT 1', 1),
+        ('SET statement_timeout = 0', None),
+        ('SET statement_timeout = 10000', None),
+        ('RESET statement_timeout', None)
+    ]
+    assert not PostgresStatement.overrides
+
+
+@pytest.mark.asyncio
+async def test_fetch_columns():
+    backend = PostgresBackend()
+    query = 'SELECT id, name FROM test'
+    # names of empty results come from the prepared statement
+    assert await backend.fetch_columns(ColumnsConnection([]), query) == (
+        [], ['id', 'name']
+    )
+    rows = [{'id': 1, 'name': 'one'}]
+    assert await backend.fetch_columns(ColumnsConnection(rows), query) == (
+        rows, ['id', 'name']
+    )
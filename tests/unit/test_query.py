@@ -0,0 +1,47 @@
+from adbc.query import Query
+
+
+def get_query(state=None):
+    # executor is not needed to build queries
+    return Query(state=state, executor=True)
+
+
+def test_query_update():
+    base = get_query({'source': ['main', 'test']})
+    query = base.where({'=': ['id', 1]}).take('id', 'name').limit(10)
+    assert query.state == {
+        'source': ['main', 'test'],
+        'where': {'=': ['id', 1]},
+        'take': {'id': 'id', 'name': 'name'},
+        'limit': 10
+    }
+    # chaining never changes the original query
+    assert base.state == {'source': ['main', 'test']}
+
+    # unchanged state is shared, not copied
+    other = query.sort('-id')
+    assert other.state['where'] is query.state['where']
+    assert other.state['take'] is query.state['take']
+
+    # merged values override existing ones
+    renamed = query.take(name='full_name')
+    assert renamed.state['take'] == {'id': 'id', 'name': 'full_name'}
+    assert query.state['take'] == {'id': 'id', 'name': 'name'}
+
+    # nested levels are copied along the path
+    nested = query.take.users('email')
+    assert nested.state['users'] == {'take': {'email': 'email'}}
+    assert nested.state['take'] is query.state['take']
+    assert 'users' not in query.state
+
+
+def test_query_update_large_state():
+    # chaining does not copy large values
+    values = [{'id': i, 'name': f'name {i}'} for i in range(10000)]
+    query = get_query({'source': ['main', 'test'], 'values': values})
+    for i in range(3):
+        chained = query.where({'>': ['id', i]}).limit(i)
+        assert chained.state['values'] is values
+        assert chained.state['limit'] == i
+    assert query.state == {'source': ['main', 'test'], 'values': values}
+    assert len(values) == 10000
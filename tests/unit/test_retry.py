@@ -0,0 +1,56 @@
+import pytest
+from adbc.retry import retry, RetryPolicy, get_policy
+
+
+def test_retry_policy():
+    policy = RetryPolicy(retries=3, base=0.1, cap=0.5)
+    for attempt in range(10):
+        delay = policy.get_delay(attempt)
+        assert 0 <= delay <= min(0.5, 0.1 * 2 ** attempt)
+
+    policies = {ConnectionError: policy}
+    assert get_policy(ConnectionResetError(), policies) is policy
+    assert get_policy(ValueError(), policies) is None
+
+    # wrapped errors use the policy of their cause
+    try:
+        try:
+            raise ConnectionResetError()
+        except ConnectionResetError as e:
+            raise Exception('query failed') from e
+    except Exception as e:
+        assert get_policy(e, policies) is policy
+
+
+@pytest.mark.asyncio
+async def test_retry():
+    calls = []
+    retries = []
+
+    async def flaky(error, failures):
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error
+        return len(calls)
+
+    def on_retry(error, attempt, delay):
+        retries.append((type(error), attempt))
+
+    policies = {ConnectionError: RetryPolicy(retries=2, base=0.001)}
+    assert await retry(
+        flaky, ConnectionResetError(), 2,
+        policies=policies, on_retry=on_retry
+    ) == 3
+    assert retries == [(ConnectionResetError, 1), (ConnectionResetError, 2)]
+
+    # out of retries
+    calls.clear()
+    with pytest.raises(ConnectionResetError):
+        await retry(flaky, ConnectionResetError(), 3, policies=policies)
+    assert len(calls) == 3
+
+    # no policy for this error
+    calls.clear()
+    with pytest.raises(ValueError):
+        await retry(flaky, ValueError(), 1, policies=policies)
+    assert len(calls) == 1
@@ -0,0 +1,298 @@
+import hashlib
+import asyncio
+import pytest
+from adbc.backends.sqlite import SqliteBackend
+
+
+def test_get_table_definition():
+    sql = '''CREATE TABLE "test" (
+        "id" integer PRIMARY KEY AUTOINCREMENT,
+        "related_id" integer,
+        "a" text NOT NULL DEFAULT 'x',
+        "b" text UNIQUE,
+        CONSTRAINT "test__related_id__fk" FOREIGN KEY ("related_id")
+            REFERENCES "related" ("id") DEFERRABLE INITIALLY DEFERRED,
+        UNIQUE ("a", "b")
+    )'''
+    columns = [
+        {'name': 'id', 'type': 'INTEGER', 'notnull': 0, 'default': None, 'pk': 1},
+        {'name': 'related_id', 'type': 'integer', 'notnull': 0, 'default': None, 'pk': 0},
+        {'name': 'a', 'type': 'text', 'notnull': 1, 'default': "'x'", 'pk': 0},
+        {'name': 'b', 'type': '', 'notnull': 0, 'default': None, 'pk': 0},
+    ]
+    foreign_keys = [
+        {'id': 0, 'seq': 0, 'table': 'related', 'from': 'related_id', 'to': None}
+    ]
+    indexes = [
+        {'name': 'test_a', 'unique': 0, 'origin': 'c', 'columns': ['a']},
+        {'name': 'sqlite_autoindex_test_1', 'unique': 1, 'origin': 'u', 'columns': ['b']},
+        {'name': 'sqlite_autoindex_test_2', 'unique': 1, 'origin': 'u', 'columns': ['a', 'b']},
+    ]
+    result = SqliteBackend.get_table_definition(
+        'test', sql, columns, foreign_keys, indexes, pks={'related': ['id']}
+    )
+    columns = {c['name']: c for c in result['columns']}
+    assert columns['id']['type'] == 'integer'
+    assert columns['id']['primary'] is True
+    assert columns['id']['sequence'] is True
+    assert columns['a']['null'] is False
+    assert columns['a']['default'] == "'x'"
+    assert columns['b']['type'] is None
+    assert columns['b']['unique'] is True
+
+    constraints = {c.pop('name'): c for c in result['constraints']}
+    assert constraints['test__related_id__fk']['related_name'] == 'related'
+    assert constraints['test__related_id__fk']['related_columns'] == ['id']
+    assert constraints['test__related_id__fk']['deferrable'] is True
+    assert constraints['test__related_id__fk']['deferred'] is True
+    assert constraints['test__a__b__uk']['columns'] == ['a', 'b']
+    assert result['indexes'] == [{
+        'name': 'test_a',
+        'type': None,
+        'primary': False,
+        'unique': False,
+        'columns': ['a']
+    }]
+
+
+@pytest.mark.asyncio
+async def test_pool(tmp_path):
+    url = f'file:{tmp_path}/test.db'
+    pool = await SqliteBackend.create_pool(url, min_size=1, max_size=3)
+    assert pool.get_stats()['idle'] == 1
+
+    # connections are reused
+    async with pool.acquire() as connection:
+        first = connection
+    async with pool.acquire() as connection:
+        assert connection is first
+        async with connection.execute('PRAGMA journal_mode') as cursor:
+            assert (await cursor.fetchone())[0] == 'wal'
+
+    async with pool.acquire(write=True) as connection:
+        await SqliteBackend.execute(connection, 'CREATE TABLE test (id integer)')
+
+    async def read():
+        async with pool.acquire() as connection:
+            await asyncio.sleep(0.01)
+            return await SqliteBackend.fetch(connection, 'SELECT count(*) FROM test')
+
+    async def write(i):
+        async with pool.acquire(write=True) as connection:
+            return await SqliteBackend.execute(
+                connection, 'INSERT INTO test VALUES (?)', [i]
+            )
+
+    results = await asyncio.gather(*[read() for _ in range(10)] + [
+        write(i) for i in range(10)
+    ])
+    assert results[10:] == [1] * 10
+    stats = pool.get_stats()
+    # max_size - 1 readers plus one writer
+    assert stats['readers'] == 2
+    assert stats['writer']
+    assert stats['acquires'] == 23
+    assert stats['waits'] > 0
+    assert stats['max_wait'] > 0
+
+    # a failed transaction is rolled back before the connection is reused
+    with pytest.raises(ZeroDivisionError):
+        async with pool.acquire(write=True) as connection:
+            async with SqliteBackend.transaction(connection):
+                await SqliteBackend.execute(connection, 'DELETE FROM test')
+                1 / 0
+    async with pool.acquire() as connection:
+        rows = await SqliteBackend.fetch(connection, 'SELECT count(*) FROM test')
+        assert rows[0][0] == 10
+
+    # nested writes must pass the writer they hold
+    async with pool.acquire(write=True) as connection:
+        with pytest.raises(Exception) as error:
+            async with pool.acquire(write=True):
+                pass
+        assert 'already holds the writer' in str(error.value)
+        assert await SqliteBackend.execute(
+            connection, 'INSERT INTO test VALUES (?)', [11]
+        ) == 1
+
+        # connections in use are closed on release
+        await pool.close()
+        assert pool.writer is connection
+    assert pool.writer is None
+    with pytest.raises(ValueError):
+        await SqliteBackend.fetch(connection, 'SELECT 1')
+
+
+@pytest.mark.asyncio
+async def test_pragmas(tmp_path):
+    url = f'file:{tmp_path}/test.db?mmap_size=0&mode=rwc'
+    pool = await SqliteBackend.create_pool(
+        url, max_size=3, pragmas={'cache_size': -1000}
+    )
+    # pragma params are removed from the URL
+    assert pool.url == f'file:{tmp_path}/test.db?mode=rwc'
+
+    async def get(connection, name):
+        rows = await SqliteBackend.fetch(connection, f'PRAGMA {name}')
+        return rows[0][0]
+
+    async with pool.acquire() as connection:
+        assert await get(connection, 'journal_mode') == 'wal'
+        assert await get(connection, 'synchronous') == 1  # normal
+        assert await get(connection, 'temp_store') == 2  # memory
+        assert await get(connection, 'cache_size') == -1000
+        assert await get(connection, 'mmap_size') == 0
+
+    async with pool.acquire(write=True) as connection:
+        async with SqliteBackend.bulk_load(connection):
+            assert await get(connection, 'synchronous') == 0  # off
+        assert await get(connection, 'synchronous') == 1
+
+        # unsafe settings cannot change inside a transaction
+        with pytest.raises(Exception):
+            async with SqliteBackend.transaction(connection):
+                async with SqliteBackend.bulk_load(connection):
+                    pass
+    await pool.close()
+
+    with pytest.raises(Exception):
+        await SqliteBackend.create_pool(url, pragmas={'cache_size': '0; DROP'})
+
+
+@pytest.mark.asyncio
+async def test_copy(tmp_path):
+    pool = await SqliteBackend.create_pool(f'file:{tmp_path}/test.db')
+    data = (
+        b'1\tone\t\\N\t\\\\x0aff\n'
+        b'2\ttab\\there\\nnewline \\\\ backslash\t3.5\t\\N\n'
+    )
+
+    async def source():
+        # rows can be split across chunks
+        for i in range(0, len(data), 7):
+            yield data[i:i + 7]
+
+    async with pool.acquire(write=True) as connection:
+        await SqliteBackend.execute(
+            connection,
+            'CREATE TABLE test (id integer, name text, n real, raw blob)'
+        )
+        count = await SqliteBackend.copy_to_table(
+            connection, 'test', source=source(), schema_name='main'
+        )
+        assert count == 2
+        rows = await SqliteBackend.fetch(connection, 'SELECT * FROM test')
+        assert [tuple(row) for row in rows] == [
+            (1, 'one', None, b'\n\xff'),
+            (2, 'tab\there\nnewline \\ backslash', 3.5, None)
+        ]
+
+        # and back, batched
+        chunks = []
+
+        async def output(chunk):
+            chunks.append(chunk)
+
+        count = await SqliteBackend.copy_from_table(
+            connection, 'test', output=output
+        )
+        assert count == 2
+        assert b''.join(chunks) == data
+
+        path = tmp_path / 'test.copy'
+        count = await SqliteBackend.copy_from_query(
+            connection, 'SELECT id, name FROM test WHERE id = ?', [1],
+            output=str(path)
+        )
+        assert count == 1
+        assert path.read_bytes() == b'1\tone\n'
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_md5_agg():
+    connection = await SqliteBackend.connect(':memory:')
+    await SqliteBackend.execute(connection, 'CREATE TABLE test (id integer, name text)')
+
+    async def get(query):
+        return (await SqliteBackend.fetch(connection, query))[0][0]
+
+    aggregate = 'SELECT md5_agg(id, name) FROM (SELECT * FROM test ORDER BY id)'
+    assert await get(aggregate) is None
+    await SqliteBackend.execute(
+        connection, "INSERT INTO test VALUES (2, NULL), (1, 'café')"
+    )
+    # same digest as md5(array_to_string(array_agg(...), ',')) in Postgres
+    expected = hashlib.md5('[1, "café"],[2, null]'.encode('utf-8')).hexdigest()
+    assert await get(aggregate) == expected
+    assert await get(
+        'SELECT md5(group_concat(json_build_array(id, name))) '
+        'FROM (SELECT * FROM test ORDER BY id)'
+    ) == expected
+    await connection.close()
+
+
+@pytest.mark.asyncio
+async def test_statement_nested():
+    connection = await SqliteBackend.connect(':memory:')
+    async with SqliteBackend.statement(connection, timeout=10):
+        async with SqliteBackend.statement(connection, timeout=0.01):
+            assert connection.statement_timeout == 0.01
+        # the outer timeout is restored
+        assert connection.statement_timeout == 10
+        assert (await SqliteBackend.fetch(connection, 'SELECT 1'))[0][0] == 1
+    assert connection.statement_timeout is None
+    await connection.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_health(tmp_path):
+    url = f'file:{tmp_path}/test.db'
+    pool = await SqliteBackend.create_pool(url, min_size=1, max_size=5)
+    assert pool.get_stats()['readers'] == 1
+
+    # readers are opened on demand or ahead of time
+    await pool.warm_up(10)
+    assert pool.get_stats()['readers'] == 4
+    assert await pool.check() == {'checked': 4, 'evicted': 0}
+
+    # stale readers are closed down to min_size
+    pool.max_idle = 0
+    await asyncio.sleep(0.01)
+    assert await pool.check() == {'checked': 4, 'evicted': 3}
+
+    # broken readers are closed
+    pool.max_idle = None
+    await pool.idle[0].close()
+    assert await pool.check() == {'checked': 1, 'evicted': 1}
+    stats = pool.get_stats()
+    assert stats['readers'] == stats['idle'] == 0
+    assert stats['evictions'] == 4
+
+    async with pool.acquire() as connection:
+        assert await SqliteBackend.fetch(connection, 'SELECT 1')
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_check_cancelled(tmp_path):
+    url = f'file:{tmp_path}/test.db'
+    pool = await SqliteBackend.create_pool(url, min_size=3, max_size=5)
+    idle = list(pool.idle)
+    ping = pool.ping
+
+    async def slow_ping(connection):
+        await asyncio.sleep(1)
+        return await ping(connection)
+
+    # connections taken out by a cancelled check are put back
+    pool.ping = slow_ping
+    check = asyncio.ensure_future(pool.check())
+    await asyncio.sleep(0.01)
+    assert not pool.idle
+    check.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await check
+    assert list(pool.idle) == idle
+    assert pool.get_stats()['readers'] == 3
+    await pool.close()
@@ -0,0 +1,52 @@
+import pytest
+from adbc.store.table import Table, Column
+
+
+def test_column():
+    column = Column({'type': 'integer', 'null': False, 'comment': 'id'})
+    assert column['type'] == 'integer'
+    assert column.get('default', 'none') == 'none'
+    assert column.get('comment') == 'id'
+    assert 'null' in column and 'default' not in column
+    assert list(column) == ['type', 'null', 'comment']
+    assert len(column) == 3
+    assert dict(column) == {'type': 'integer', 'null': False, 'comment': 'id'}
+
+    # None is a value, unlike a missing field
+    column['default'] = None
+    column['extra'] = True
+    assert 'default' in column and column['extra'] is True
+    assert len(column) == 5
+
+    del column['default']
+    del column['comment']
+    assert 'default' not in column and 'comment' not in column
+    assert list(column) == ['type', 'null', 'extra']
+    for key in ('default', 'missing'):
+        with pytest.raises(KeyError):
+            column[key]
+        with pytest.raises(KeyError):
+            del column[key]
+
+
+def test_table_lazy_initialization():
+    table = Table(
+        'test',
+        columns=[
+            {'name': 'id', 'type': 'integer', 'null': False},
+            {'name': 'name', 'type': 'text', 'null': True, 'unique': True}
+        ],
+        constraints=[
+            {'name': 'test__id__pk', 'type': 'primary', 'columns': ['id']}
+        ]
+    )
+    assert not table._initialized
+    # names do not need initialization
+    assert table.column_names == ['id', 'name']
+    assert not table._initialized
+
+    assert table.pks == {'id': 'test__id__pk'}
+    assert table._initialized
+    assert table.columns['id']['primary'] == 'test__id__pk'
+    assert table.columns['name']['primary'] is False
+    assert 'test__name__uk' in table.constraints
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from adbc.utils import FairSemaphore, LimitedContext, aecho, fair_group
+
+
+@pytest.mark.asyncio
+async def test_fair_semaphore():
+    semaphore = FairSemaphore(2)
+    order = []
+    running = 0
+    peak = 0
+
+    async def job(group, i):
+        nonlocal running, peak
+        fair_group.set(group)
+        async with semaphore:
+            running += 1
+            peak = max(peak, running)
+            order.append(group)
+            await asyncio.sleep(0)
+            running -= 1
+
+    async def run(group, count):
+        # each group runs its jobs in parallel
+        await asyncio.gather(*[job(group, i) for i in range(count)])
+
+    # "big" queues all of its jobs before "small" gets a chance
+    await asyncio.gather(run('big', 20), run('small', 2))
+    assert peak == 2
+    assert len(order) == 22
+    # "small" is served in turn rather than after all of "big"
+    assert order.index('small') < 5
+    assert semaphore.waiting == 0
+
+    # cancelled waiters give up their place
+    await semaphore.acquire()
+    await semaphore.acquire()
+    waiter = asyncio.ensure_future(semaphore.acquire())
+    await asyncio.sleep(0)
+    assert semaphore.waiting == 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert semaphore.waiting == 0
+    semaphore.release()
+    semaphore.release()
+    assert semaphore._free == 2
+
+
+@pytest.mark.asyncio
+async def test_fair_semaphore_grow():
+    semaphore = FairSemaphore(1)
+    await semaphore.acquire()
+    waiter = asyncio.ensure_future(semaphore.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    # new slots go to waiters first
+    semaphore.grow(3)
+    assert await waiter
+    assert semaphore.value == 3
+    assert semaphore.busy == 2
+
+
+async def enter(context):
+    async with context:
+        return True
+
+
+@pytest.mark.asyncio
+async def test_limited_context_reentrant():
+    semaphore = FairSemaphore(1)
+
+    def limited(reentrant=True):
+        return LimitedContext(semaphore, aecho(), reentrant=reentrant)
+
+    async with limited():
+        # shared with nested contexts and the tasks they start
+        async with limited():
+            assert await asyncio.ensure_future(enter(limited())) is True
+        assert semaphore._free == 0
+        # others wait
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(enter(limited(False)), 0.01)
+    assert semaphore._free == 1
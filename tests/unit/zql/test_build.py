@@ -434,6 +434,34 @@ def test_build_update():
                 'WHERE "name" = %s\n'
                 'RETURNING "id", concat("first_name", "last_name") AS "name"', ['foo']
             )]
+        ), (  # 4. update from values
+            {
+                "update": {
+                    "table": "testing.test",
+                    "set": {"name": "v.name"},
+                    "from": {
+                        "v": {
+                            "values": [
+                                [{"cast": [1, "integer"]}, {"cast": ["'a'", "text"]}],
+                                [{"cast": [2, "integer"]}, {"cast": ["'b'", "text"]}]
+                            ],
+                            "columns": ["id", "name"]
+                        }
+                    },
+                    "where": {"=": ["testing.test.id", "v.id"]}
+                }
+            },
+            [(
+                'UPDATE "testing"."test"\n'
+                'SET\n'
+                '    "name" = "v"."name"\n'
+                'FROM (\n'
+                'VALUES\n'
+                '    (CAST(1 AS integer), CAST(%s AS text)),\n'
+                '    (CAST(2 AS integer), CAST(%s AS text))\n'
+                ') AS "v" ("id", "name")\n'
+                'WHERE "testing"."test"."id" = "v"."id"', ['a', 'b']
+            )]
         )
     ]
     for query, expected in expectations:
@@ -499,6 +527,63 @@ def test_build_insert():
                 '    SELECT "name"\n'
                 '    FROM "other"."user"', []
             )]
+        ), (  # 5. upsert
+            {
+                "insert": {
+                    "table": "testing.user",
+                    "columns": ["id", "name", "email"],
+                    "values": [
+                        [1, "'jim'", "'jim@test.com'"],
+                        [2, "'jane'", "'jane@test.com'"]
+                    ],
+                    "conflict": {
+                        "on": ["id"],
+                        "update": ["name", "email"]
+                    }
+                }
+            },
+            [(
+                'INSERT INTO "testing"."user" ("id", "name", "email")\n'
+                'VALUES\n'
+                '    (1, %s, %s),\n'
+                '    (2, %s, %s)\n'
+                'ON CONFLICT ("id") DO UPDATE SET\n'
+                '    "name" = EXCLUDED."name",\n'
+                '    "email" = EXCLUDED."email"',
+                ['jim', 'jim@test.com', 'jane', 'jane@test.com']
+            )]
+        ), (  # 6. upsert with expressions
+            {
+                "insert": {
+                    "table": "testing.user",
+                    "columns": ["id", "visits"],
+                    "values": [1, 1],
+                    "conflict": {
+                        "on": "id",
+                        "update": {"visits": {"+": ["user.visits", 1]}}
+                    }
+                }
+            },
+            [(
+                'INSERT INTO "testing"."user" ("id", "visits")\n'
+                'VALUES (1, 1)\n'
+                'ON CONFLICT ("id") DO UPDATE SET\n'
+                '    "visits" = "user"."visits" + 1', []
+            )]
+        ), (  # 7. skip conflicts
+            {
+                "insert": {
+                    "table": "testing.user",
+                    "columns": ["id"],
+                    "values": [1],
+                    "conflict": {"on": ["id"]}
+                }
+            },
+            [(
+                'INSERT INTO "testing"."user" ("id")\n'
+                'VALUES (1)\n'
+                'ON CONFLICT ("id") DO NOTHING', []
+            )]
         )
     ]
     for query, expected in expectations:
@@ -539,6 +624,21 @@ def test_build_truncate():
         assert expected == result
 
 
+def test_build_many():
+    dialect = get_dialect()
+    query = [
+        {'truncate': 'test'},
+        {'create': {'column': {'on': 'test', 'name': 'name', 'type': 'text'}}}
+    ]
+    assert build(query, dialect=dialect) == [
+        ('TRUNCATE "test"', []),
+        ('ALTER TABLE "test" ADD COLUMN "name" text', [])
+    ]
+    assert build(query, dialect=dialect, combine=True) == (
+        'TRUNCATE "test";\nALTER TABLE "test" ADD COLUMN "name" text', []
+    )
+
+
 def test_build_drop():
     dialect = get_dialect()
     expectations = [
@@ -588,3 +688,63 @@ def test_build_drop():
 
 def test_build_select():
     pass
+
+
+def test_build_cache():
+    from adbc.zql.builder import compile_cache
+
+    dialect = Dialect(
+        backend=Backend.POSTGRES, style=ParameterStyle.DOLLAR_NUMERIC
+    )
+
+    def get_query(cursor, name):
+        return {
+            'select': {
+                'data': ['id', 'name'],
+                'from': 'test',
+                'where': {
+                    'and': [
+                        {'>': ['id', cursor]},
+                        {'=': ['name', name]},
+                        {'in': ['type', ["'a'", "'b'"]]},
+                        {'icontains': ['name', "'ja'"]},
+                        {'=': [1, 1]}
+                    ]
+                },
+                'limit': 10
+            }
+        }
+
+    expected = (
+        'SELECT\n    "id",\n    "name"\nFROM "test"\n'
+        'WHERE ("id" > $1) and ("name" = $2) and "type" IN ($3, $4)'
+        ' and ("name" ilike $5) and (1 = 1)\nLIMIT 10'
+    )
+    query = get_query(1, "'x'")
+    assert build(query, dialect=dialect, cache=True) == [
+        (expected, [1, 'x', 'a', 'b', '%ja%'])
+    ]
+    # the cached path does not mutate the input
+    assert query == get_query(1, "'x'")
+
+    hits = compile_cache.hits
+    sql, params = build(get_query(100, "'y'"), dialect=dialect, cache=True)[0]
+    assert compile_cache.hits == hits + 1
+    assert sql == expected
+    assert params == [100, 'y', 'a', 'b', '%ja%']
+
+    # combined queries share the cache too
+    sql, params = build(
+        get_query(5, "'z'"), dialect=dialect, combine=True, cache=True
+    )
+    assert sql == expected
+    assert params == [5, 'z', 'a', 'b', '%ja%']
+
+    # DDL is never cached
+    query = {'create': {'schema': 'one'}}
+    assert build(query, dialect=dialect, cache=True) == [('CREATE SCHEMA "one"', [])]
+
+    # key order is part of the template
+    one = build({'select': {'data': {'a': 'x', 'b': 'y'}}}, dialect=dialect, cache=True)
+    two = build({'select': {'data': {'b': 'y', 'a': 'x'}}}, dialect=dialect, cache=True)
+    assert one != two
@@ -0,0 +1,60 @@
+from adbc.zql import parse_expression
+from adbc.zql.parser import expression_cache
+from adbc.zql.dialect import Backend
+from adbc.store.table import Table
+from adbc.backends.postgres import PostgresBackend
+
+
+DEFAULTS = [
+    "nextval('public.users__id__seq'::regclass)",
+    "now()",
+    "false",
+    "'active'::character varying",
+    None,
+]
+
+
+def test_parse_expression_cache():
+    expression = "nextval('test__id__seq'::regclass)"
+    result = parse_expression(expression, Backend.POSTGRES)
+    assert result == {'nextval': "'test__id__seq'"}
+
+    # results can be modified without affecting the cache
+    result['nextval'] = None
+    hits = expression_cache.hits
+    assert parse_expression(expression, Backend.POSTGRES) == {
+        'nextval': "'test__id__seq'"
+    }
+    assert expression_cache.hits == hits + 1
+
+    assert parse_expression("'a'::text", Backend.POSTGRES) == "'a'"
+    assert parse_expression(None, Backend.POSTGRES) is None
+
+
+def test_parse_expression_catalog():
+    expression_cache.clear()
+    misses = expression_cache.misses
+    backend = PostgresBackend()
+    num_tables = 20
+    num_columns = 50
+    for t in range(num_tables):
+        table = Table(
+            f'table_{t}',
+            backend=backend,
+            columns=[{
+                'name': f'column_{c}',
+                'type': 'integer',
+                'default': DEFAULTS[c % len(DEFAULTS)],
+                'null': True
+            } for c in range(num_columns)],
+            constraints=[{
+                'name': f'table_{t}__pk',
+                'type': 'primary',
+                'columns': ['column_0']
+            }]
+        )
+        assert table.pk == 'column_0'
+        assert table.columns['column_1']['default'] == {'now': ''}
+    # each distinct default is parsed once
+    assert len(expression_cache) == len(DEFAULTS) - 1
+    assert expression_cache.misses - misses == len(DEFAULTS) - 1